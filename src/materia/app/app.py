@@ -1,4 +1,5 @@
 from contextlib import _AsyncGeneratorContextManager, asynccontextmanager
+import asyncio
 import os
 import sys
 from typing import AsyncIterator, TypedDict, Self, Optional
@@ -16,6 +17,9 @@ from materia.core import (
     Database,
     Cache,
     Cron,
+    FileSystem,
+    BlockingDetector,
+    AssetManifest,
 )
 from materia import routers
 from materia.core.misc import optional, optional_string
@@ -26,6 +30,7 @@ class Context(TypedDict):
     logger: LoggerInstance
     database: Database
     cache: Cache
+    assets: dict[str, AssetManifest]
 
 
 class ApplicationError(Exception):
@@ -42,6 +47,7 @@ class Application:
         self.database: Optional[Database] = None
         self.cache: Optional[Cache] = None
         self.cron: Optional[Cron] = None
+        self.assets: Optional[dict[str, AssetManifest]] = None
         self.backend: Optional[FastAPI] = None
 
         self.prepare_logger()
@@ -58,9 +64,7 @@ class Application:
         await app.prepare_working_directory()
 
         try:
-            await app.prepare_database()
-            await app.prepare_cache()
-            await app.prepare_cron()
+            await app.prepare_services()
             app.prepare_server()
         except Exception as e:
             app.logger.error(" ".join(e.args))
@@ -87,10 +91,46 @@ class Application:
             self.logger.error("Failed to change working directory: {}", e)
             sys.exit()
 
+    async def prepare_services(self):
+        """Connect the database, the cache and the cron broker and build the
+        asset manifests, those that are not prepared yet, concurrently.
+        """
+        await asyncio.gather(
+            *(
+                prepare()
+                for service, prepare in (
+                    (self.database, self.prepare_database),
+                    (self.cache, self.prepare_cache),
+                    (self.cron, self.prepare_cron),
+                    (self.assets, self.prepare_assets),
+                )
+                if service is None
+            )
+        )
+
     async def prepare_database(self):
         url = self.config.database.url()
         self.logger.info("Connecting to database {}", url)
-        self.database = await Database.new(url)  # type: ignore
+        self.database = await Database.new(
+            url,  # type: ignore
+            pool_size=self.config.database.pool_size,
+            max_overflow=self.config.database.max_overflow,
+            pool_timeout=self.config.database.pool_timeout,
+            pool_recycle=self.config.database.pool_recycle,
+            pool_pre_ping=self.config.database.pool_pre_ping,
+            statement_cache_size=(
+                self.config.database.statement_cache_size
+                if self.config.database.prepared_statements
+                else 0
+            ),
+            prepared_statement_cache_size=(
+                self.config.database.prepared_statement_cache_size
+                if self.config.database.prepared_statements
+                else 0
+            ),
+            replicas=self.config.database.replicas,
+            slow_query_threshold=self.config.metrics.slow_query_threshold,
+        )
 
     async def prepare_cache(self):
         url = self.config.cache.url()
@@ -100,22 +140,78 @@ class Application:
     async def prepare_cron(self):
         url = self.config.cache.url()
         self.logger.info("Prepairing cron")
-        self.cron = Cron.new(
-            self.config.cron.workers_count, backend_url=url, broker_url=url
+        # the broker connection test blocks
+        self.cron = await asyncio.to_thread(
+            Cron.new,
+            self.config.cron.workers_count,
+            backend_url=url,
+            broker_url=url,
+            prefetch_multiplier=self.config.cron.prefetch_multiplier,
+            queues=self.config.cron.queues,
+            routes=self.config.cron.routes,
+            config=self.config,
         )
 
+    async def prepare_assets(self):
+        directories = {}
+        assets = {}
+
+        try:
+            import materia_frontend
+        except ModuleNotFoundError:
+            pass
+        else:
+            directories["frontend"] = Path(materia_frontend.__path__[0]) / "dist"
+
+        try:
+            from materia import docs as materia_docs
+        except ImportError:
+            pass
+        else:
+            directories["docs"] = Path(materia_docs.__path__[0])
+
+        for name, directory in directories.items():
+            self.logger.debug("Building {} asset manifest", name)
+            assets[name] = await FileSystem.run(
+                AssetManifest.build,
+                directory.resolve(),
+                self.config.application.working_directory.joinpath(
+                    "cache", "assets"
+                ),
+            )
+
+        self.assets = assets
+
     def prepare_server(self):
         @asynccontextmanager
         async def lifespan(app: FastAPI) -> AsyncIterator[Context]:
+            FileSystem.configure(self.config.application.io_threads)
+            # workers of a multi-process server open their own pools after fork
+            await self.prepare_services()
+
+            detector = None
+            if self.config.profiling.blocking_detection:
+                self.logger.warning(
+                    "Event loop blocking detection is enabled [{} ms]",
+                    self.config.profiling.blocking_threshold * 1000,
+                )
+                detector = BlockingDetector(self.config.profiling.blocking_threshold)
+                detector.start()
+
             yield Context(
                 config=self.config,
                 logger=self.logger,
                 database=self.database,
                 cache=self.cache,
+                assets=self.assets,
             )
 
+            if detector:
+                await detector.stop()
             if self.database.engine is not None:
                 await self.database.dispose()
+            await self.cache.dispose()
+            FileSystem.shutdown()
 
         self.backend = FastAPI(
             title="materia",
@@ -124,9 +220,11 @@ class Application:
             redoc_url=None,
             swagger_ui_init_oauth=None,
             swagger_ui_oauth2_redirect_url=None,
-            openapi_url="/api/openapi.json",
+            # served prebuilt by `routers.api.docs`
+            openapi_url=None,
             lifespan=lifespan,
         )
+        self.backend.openapi_url = "/api/openapi.json"
         self.backend.add_middleware(
             CORSMiddleware,
             allow_origins=["http://localhost", "http://localhost:5173"],
@@ -134,6 +232,23 @@ class Application:
             allow_methods=["*"],
             allow_headers=["*"],
         )
+        if self.config.server.compression:
+            self.backend.add_middleware(
+                routers.middleware.CompressionMiddleware,
+                min_size=self.config.server.compression_min_size,
+            )
+        self.backend.add_middleware(
+            routers.middleware.QueryStatsMiddleware,
+            server_timing=self.config.metrics.server_timing,
+        )
+        if self.config.database.replicas:
+            self.backend.add_middleware(
+                routers.middleware.ReadYourWritesMiddleware,
+                lag_window=self.config.database.replica_lag_window,
+            )
+        if self.config.metrics.enabled:
+            self.backend.add_middleware(routers.middleware.MetricsMiddleware)
+            self.backend.include_router(routers.metrics.router)
         self.backend.include_router(routers.docs.router)
         self.backend.include_router(routers.api.router)
         self.backend.include_router(routers.resources.router)
@@ -146,9 +261,18 @@ class Application:
                     + route.name
                 )
 
+    def openapi(self) -> bytes:
+        """Serialized OpenAPI specification, built once per application."""
+        return routers.api.docs.openapi_json(self.backend)[0]
+
     async def start(self):
-        self.logger.info(f"Spinning up cron workers [{self.config.cron.workers_count}]")
-        self.cron.run_workers()
+        if self.config.cron.mode == "thread":
+            self.logger.info(
+                f"Spinning up cron workers [{self.config.cron.workers_count}]"
+            )
+            self.cron.run_workers()
+        else:
+            self.logger.info("Cron workers are expected to run with `materia cron`")
 
         try:
             self.logger.info("Running database migrations")
@@ -158,7 +282,10 @@ class Application:
                 self.backend,
                 port=self.config.server.port,
                 host=str(self.config.server.address),
-                log_config=Logger.uvicorn_config(self.config.log.level),
+                log_config=Logger.uvicorn_config(
+                    self.config.log.level, self.config.log.access_sample_rate
+                ),
+                **self.config.server.uvicorn_options(),
             )
             server = uvicorn.Server(uvicorn_config)
 
@@ -169,3 +296,56 @@ class Application:
         except Exception as e:
             self.logger.error(" ".join(e.args))
             sys.exit()
+
+    async def prepare_workers(self):
+        """Prepare the master process of a multi-process server.
+        Migrations run once here and the OpenAPI specification is prebuilt
+        for all workers, then connections are released so that forked
+        workers do not share pools or the broker connection.
+        """
+        if self.config.cron.mode == "thread":
+            self.logger.error(
+                "Cron workers cannot run in threads of a multi-process server. "
+                'Set `cron.mode = "process"` and run them with `materia cron`.'
+            )
+            sys.exit(1)
+
+        self.logger.info("Running database migrations")
+        await self.database.run_migrations()
+
+        self.openapi()
+
+        await self.database.dispose()
+        await self.cache.dispose()
+        await asyncio.to_thread(self.cron.dispose)
+        self.database = None
+        self.cache = None
+        self.cron = None
+
+    def start_workers(self):
+        from materia.app.wsgi import MateriaProcessManager
+        from materia.app.asgi import MateriaWorker
+
+        self.logger.info(f"Spinning up server workers [{self.config.server.workers}]")
+
+        options = {
+            "bind": "{}:{}".format(self.config.server.address, self.config.server.port),
+            "workers": self.config.server.workers,
+            "worker_class": MateriaWorker.configure(
+                **self.config.server.uvicorn_options()
+            ),
+            "preload_app": True,
+            "backlog": self.config.server.backlog,
+            "keepalive": self.config.server.timeout_keep_alive,
+            "graceful_timeout": self.config.server.graceful_timeout,
+            "max_requests": self.config.server.max_requests,
+            "max_requests_jitter": self.config.server.max_requests_jitter,
+            "user": None,
+            "group": None,
+        }
+
+        try:
+            MateriaProcessManager(self.backend, options).run()
+        except (KeyboardInterrupt, SystemExit):
+            self.logger.info("Exiting...")
+            sys.exit()
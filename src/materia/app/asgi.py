@@ -1,12 +1,17 @@
-from os import environ
-from pathlib import Path
-from uvicorn.workers import UvicornWorker
-from materia.config import Config
-from materia._logging import uvicorn_log_config
+from typing import Self
+from uvicorn_worker import UvicornWorker
 
 
 class MateriaWorker(UvicornWorker):
     CONFIG_KWARGS = {
-        "loop": "uvloop",
-        "log_config": uvicorn_log_config(Config.open(Path(environ["MATERIA_CONFIG"]).resolve()))
+        "loop": "auto",
+        "http": "auto",
+        "lifespan": "on",
+        # logging is configured by the master process and inherited on fork
+        "log_config": None,
     }
+
+    @classmethod
+    def configure(cls, **kwargs) -> type[Self]:
+        """Create a worker class with extra uvicorn options."""
+        return type(cls.__name__, (cls,), {"CONFIG_KWARGS": cls.CONFIG_KWARGS | kwargs})
@@ -0,0 +1,266 @@
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from itertools import count
+from pathlib import PurePosixPath
+from time import monotonic, perf_counter
+from typing import Awaitable, Callable, Literal, TypeAlias
+from uuid import uuid4
+import asyncio
+import os
+import random
+
+import httpx
+
+Operation: TypeAlias = Literal["signin", "upload", "list", "copy", "move", "delete"]
+
+operations: tuple[Operation, ...] = (
+    "signin",
+    "upload",
+    "list",
+    "copy",
+    "move",
+    "delete",
+)
+default_mix: dict[Operation, int] = {
+    "signin": 1,
+    "upload": 4,
+    "list": 10,
+    "copy": 2,
+    "move": 2,
+    "delete": 2,
+}
+
+
+class BenchError(Exception):
+    pass
+
+
+def parse_mix(value: str) -> dict[Operation, int]:
+    """Operation weights from a string like `list=10,upload=2`."""
+    mix = {}
+
+    for item in filter(None, map(str.strip, value.split(","))):
+        operation, _, weight = item.partition("=")
+        if operation not in operations:
+            raise BenchError(f"Unknown operation: {operation}")
+        try:
+            mix[operation] = int(weight or 1)
+        except ValueError:
+            raise BenchError(f"Invalid weight of {operation}: {weight}")
+
+    if not any(mix.values()):
+        raise BenchError("Operation mix is empty")
+
+    return mix
+
+
+def percentile(latencies: list[float], q: float) -> float:
+    """Nearest-rank percentile of sorted latencies."""
+    if not latencies:
+        return 0.0
+
+    return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+class VirtualUser:
+    """Client of a single benchmark account working in its own part of the
+    synthetic tree: `directories` directories of `files` files each, and a
+    scratch directory for copies.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        index: int,
+        root: str,
+        directories: int,
+        files: int,
+        data: bytes,
+    ):
+        self.client = client
+        self.credentials = {
+            "name": f"bench-{index}",
+            "password": "iambenchmark",
+            "email": f"bench-{index}@example.com",
+        }
+        self.root = PurePosixPath(root)
+        self.directories = [self.root.joinpath(f"dir-{n}") for n in range(directories)]
+        self.scratch = self.root.joinpath("scratch")
+        self.files_count = files
+        self.data = data
+        # synthetic files are copied, uploaded ones are moved and deleted
+        self.tree: list[PurePosixPath] = []
+        self.uploads: list[PurePosixPath] = []
+        self.names = count()
+        self.operations: dict[Operation, Callable[[], Awaitable]] = {
+            "signin": self.signin,
+            "upload": self.upload,
+            "list": self.list_directory,
+            "copy": self.copy,
+            "move": self.move,
+            "delete": self.delete,
+        }
+
+    async def prepare(self):
+        # the account and the repository are kept between runs
+        await self.client.post("/api/auth/signup", json=self.credentials)
+        await self.signin()
+        await self.client.post("/api/repository")
+
+        for directory in [*self.directories, self.scratch]:
+            response = await self.client.post(
+                "/api/directory", json={"path": str(directory)}
+            )
+            response.raise_for_status()
+
+        for directory in self.directories:
+            for n in range(self.files_count):
+                path = directory.joinpath(f"file-{n}.bin")
+                await self._upload(path)
+                self.tree.append(path)
+
+    def choose(self, mix: dict[Operation, int]) -> Operation:
+        operation = random.choices(list(mix), weights=list(mix.values()))[0]
+
+        if operation in ("move", "delete") and not self.uploads:
+            return "upload"
+        if operation == "copy" and not self.tree:
+            return "list"
+
+        return operation
+
+    async def _upload(self, path: PurePosixPath):
+        response = await self.client.post(
+            "/api/file",
+            files={"file": (path.name, self.data)},
+            data={"path": str(path.parent)},
+        )
+        response.raise_for_status()
+
+    async def signin(self):
+        response = await self.client.post("/api/auth/signin", json=self.credentials)
+        response.raise_for_status()
+        self.client.cookies = response.cookies
+
+    async def upload(self):
+        path = random.choice(self.directories).joinpath(
+            f"upload-{next(self.names)}.bin"
+        )
+        await self._upload(path)
+        self.uploads.append(path)
+
+    async def list_directory(self):
+        response = await self.client.get(
+            "/api/directory/content",
+            params={"path": str(random.choice(self.directories))},
+        )
+        response.raise_for_status()
+
+    async def copy(self):
+        response = await self.client.post(
+            "/api/file/copy",
+            # repeated copies of a file get numbered names in the scratch directory
+            json={
+                "path": str(random.choice(self.tree)),
+                "target": str(self.scratch),
+                "force": True,
+            },
+        )
+        response.raise_for_status()
+
+    async def move(self):
+        path = self.uploads.pop(random.randrange(len(self.uploads)))
+        target = random.choice(
+            [directory for directory in self.directories if directory != path.parent]
+            or [self.scratch]
+        )
+
+        response = await self.client.patch(
+            "/api/file/move", json={"path": str(path), "target": str(target)}
+        )
+        response.raise_for_status()
+        self.uploads.append(target.joinpath(path.name))
+
+    async def delete(self):
+        path = self.uploads.pop(random.randrange(len(self.uploads)))
+
+        response = await self.client.delete("/api/file", params={"path": str(path)})
+        response.raise_for_status()
+
+
+async def run_bench(
+    url: str,
+    clients: int = 32,
+    duration: float = 30,
+    mix: dict[Operation, int] = default_mix,
+    directories: int = 8,
+    files: int = 16,
+    file_size: int = 64 << 10,
+) -> dict:
+    """Drive the server from `clients` concurrent clients, each with its own
+    account and connection, for `duration` seconds after the synthetic tree
+    is uploaded. Returns throughput and latency percentiles per operation.
+    """
+    root = f"/bench-{uuid4().hex[:8]}"
+    data = os.urandom(file_size)
+    latencies: dict[Operation, list[float]] = defaultdict(list)
+    errors: dict[Operation, int] = defaultdict(int)
+
+    async with AsyncExitStack() as stack:
+        users = [
+            VirtualUser(
+                await stack.enter_async_context(
+                    httpx.AsyncClient(base_url=url, timeout=None)
+                ),
+                index,
+                root,
+                directories,
+                files,
+                data,
+            )
+            for index in range(clients)
+        ]
+
+        try:
+            await asyncio.gather(*(user.prepare() for user in users))
+        except httpx.HTTPError as e:
+            raise BenchError(f"Failed to prepare the synthetic tree: {e}") from e
+
+        deadline = monotonic() + duration
+
+        async def drive(user: VirtualUser):
+            while monotonic() < deadline:
+                operation = user.choose(mix)
+                start = perf_counter()
+                try:
+                    await user.operations[operation]()
+                except httpx.HTTPError:
+                    errors[operation] += 1
+                latencies[operation].append(perf_counter() - start)
+
+        started = monotonic()
+        await asyncio.gather(*(drive(user) for user in users))
+        elapsed = monotonic() - started
+
+    results = {}
+    for operation in operations:
+        if not (samples := sorted(latencies[operation])):
+            continue
+
+        results[operation] = {
+            "requests": len(samples),
+            "errors": errors[operation],
+            "throughput": len(samples) / elapsed,
+            "p50": percentile(samples, 0.50),
+            "p95": percentile(samples, 0.95),
+            "p99": percentile(samples, 0.99),
+        }
+
+    total = sum(result["requests"] for result in results.values())
+
+    return {
+        "clients": clients,
+        "duration": elapsed,
+        "throughput": total / elapsed,
+        "operations": results,
+    }
@@ -1,11 +1,15 @@
 from pathlib import Path
+from typing import Optional
+import os
 import sys
 import click
 from materia.core.config import Config
-from materia.core.logging import Logger
+from materia.core.logging import Logger, LoggerInstance
+from materia.core.cron import Cron, CronError
 from materia.app import Application
 import asyncio
 import json
+import time
 
 
 @click.group()
@@ -13,13 +17,7 @@ def cli():
     pass
 
 
-@cli.command()
-@click.option("--config", type=Path)
-@click.option("--debug", "-d", is_flag=True, default=False, help="Enable debug output.")
-def start(config: Path, debug: bool):
-    config_path = config
-    logger = Logger.new()
-
+def load_config(config_path: Optional[Path], logger: LoggerInstance) -> Config:
     # check the configuration file or use default
     if config_path is not None:
         config_path = config_path.resolve()
@@ -29,34 +27,348 @@ def start(config: Path, debug: bool):
                 logger.error("Configuration file was not found at {}.", config_path)
                 sys.exit(1)
             else:
-                config = Config.open(config_path.resolve())
+                return Config.open(config_path.resolve())
         except Exception as e:
             logger.error("Failed to read configuration file: {}", e)
             sys.exit(1)
-    else:
-        # trying to find configuration file in the current working directory
-        config_path = Config.data_dir().joinpath("config.toml")
-        if config_path.exists():
-            logger.info("Found configuration file in the current working directory.")
-            try:
-                config = Config.open(config_path)
-            except Exception as e:
-                logger.error("Failed to read configuration file: {}", e)
-            else:
-                logger.info("Using the default configuration.")
-                config = Config()
-        else:
-            logger.info("Using the default configuration.")
-            config = Config()
+
+    # trying to find configuration file in the current working directory
+    config_path = Config.data_dir().joinpath("config.toml")
+    if config_path.exists():
+        logger.info("Found configuration file in the current working directory.")
+        try:
+            return Config.open(config_path)
+        except Exception as e:
+            logger.error("Failed to read configuration file: {}", e)
+
+    logger.info("Using the default configuration.")
+    return Config()
+
+
+@cli.command()
+@click.option("--config", type=Path)
+@click.option("--debug", "-d", is_flag=True, default=False, help="Enable debug output.")
+@click.option(
+    "--workers",
+    "-w",
+    type=int,
+    default=None,
+    help="Number of server worker processes (overrides `server.workers`).",
+)
+def start(config: Path, debug: bool, workers: Optional[int]):
+    logger = Logger.new()
+    config = load_config(config, logger)
 
     if debug:
         config.log.level = "debug"
+    if workers:
+        config.server.workers = workers
 
-    async def main():
+    async def main() -> Optional[Application]:
         app = await Application.new(config)
+
+        if config.server.workers > 1:
+            await app.prepare_workers()
+            return app
+
         await app.start()
 
-    asyncio.run(main())
+    if app := asyncio.run(main()):
+        app.start_workers()
+
+
+@cli.command(help="Run standalone cron workers.")
+@click.option("--config", type=Path)
+@click.option("--debug", "-d", is_flag=True, default=False, help="Enable debug output.")
+@click.option(
+    "--pool",
+    type=click.Choice(["prefork", "processes", "threads", "solo"]),
+    default=None,
+    help="Worker execution pool (overrides `cron.pool`).",
+)
+@click.option(
+    "--concurrency",
+    "-c",
+    type=int,
+    default=None,
+    help="Number of concurrent workers (overrides `cron.concurrency`).",
+)
+@click.option(
+    "--queue",
+    "-Q",
+    "queues",
+    multiple=True,
+    help="Queue to consume from (overrides `cron.queues`).",
+)
+def cron(
+    config: Path,
+    debug: bool,
+    pool: Optional[str],
+    concurrency: Optional[int],
+    queues: tuple[str],
+):
+    logger = Logger.new()
+    config = load_config(config, logger)
+
+    if debug:
+        config.log.level = "debug"
+    if pool:
+        config.cron.pool = pool
+    if concurrency:
+        config.cron.concurrency = concurrency
+    if queues:
+        config.cron.queues = list(queues)
+
+    logger = Logger.new(**config.log.model_dump())
+
+    try:
+        os.chdir(config.application.working_directory.resolve())
+    except FileNotFoundError as e:
+        logger.error("Failed to change working directory: {}", e)
+        sys.exit(1)
+
+    url = config.cache.url()
+    logger.info("Connecting to cron broker {}", url)
+
+    try:
+        cron = Cron.new(
+            config.cron.workers_count,
+            backend_url=url,
+            broker_url=url,
+            prefetch_multiplier=config.cron.prefetch_multiplier,
+            queues=config.cron.queues,
+            routes=config.cron.routes,
+            config=config,
+            include=["materia.tasks"],
+        )
+    except CronError as e:
+        logger.error("{}", e)
+        sys.exit(1)
+
+    logger.info(
+        "Spinning up cron worker pool [{}: {}] for queues: {}",
+        config.cron.pool,
+        config.cron.concurrency or os.cpu_count(),
+        ", ".join(config.cron.queues),
+    )
+
+    try:
+        cron.run_worker_pool(
+            pool=config.cron.pool,
+            concurrency=config.cron.concurrency,
+            loglevel="debug" if config.log.level == "trace" else config.log.level,
+        )
+    except CronError as e:
+        logger.error("{}", e)
+        sys.exit(1)
+
+
+@cli.command(help="Drive a running server with a mixed workload.")
+@click.option("--config", type=Path)
+@click.option("--url", default=None, help="Server URL (defaults to `server` settings).")
+@click.option(
+    "--clients", "-c", type=int, default=32, help="Number of concurrent clients."
+)
+@click.option(
+    "--duration", "-t", type=float, default=30, help="Duration of the run in seconds."
+)
+@click.option(
+    "--mix",
+    default="signin=1,upload=4,list=10,copy=2,move=2,delete=2",
+    show_default=True,
+    help="Weights of the signin, upload, list, copy, move and delete operations.",
+)
+@click.option(
+    "--directories", type=int, default=8, help="Synthetic directories per client."
+)
+@click.option("--files", type=int, default=16, help="Synthetic files per directory.")
+@click.option(
+    "--file-size", type=int, default=64 << 10, help="Size of uploaded files in bytes."
+)
+@click.option("--output", "-o", type=Path, help="Write results as JSON.")
+def bench(
+    config: Path,
+    url: Optional[str],
+    clients: int,
+    duration: float,
+    mix: str,
+    directories: int,
+    files: int,
+    file_size: int,
+    output: Optional[Path],
+):
+    from materia.app.bench import BenchError, parse_mix, run_bench
+
+    logger = Logger.new()
+
+    try:
+        weights = parse_mix(mix)
+    except BenchError as e:
+        logger.error("{}", e)
+        sys.exit(1)
+
+    if url is None:
+        url = load_config(config, logger).server.url()
+
+    logger.info("Running {} clients against {} for {} s", clients, url, duration)
+
+    try:
+        results = asyncio.run(
+            run_bench(url, clients, duration, weights, directories, files, file_size)
+        )
+    except BenchError as e:
+        logger.error("{}", e)
+        sys.exit(1)
+
+    click.echo(
+        "{:<8} {:>9} {:>10} {:>9} {:>9} {:>9} {:>7}".format(
+            "", "requests", "req/s", "p50 ms", "p95 ms", "p99 ms", "errors"
+        )
+    )
+    for operation, result in results["operations"].items():
+        click.echo(
+            "{:<8} {:>9} {:>10.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>7}".format(
+                operation,
+                result["requests"],
+                result["throughput"],
+                result["p50"] * 1000,
+                result["p95"] * 1000,
+                result["p99"] * 1000,
+                result["errors"],
+            )
+        )
+    click.echo("{:<8} {:>20.1f}".format("total", results["throughput"]))
+
+    if output:
+        output.write_text(json.dumps(results, indent=4))
+
+
+@cli.command(help="Generate a synthetic tree in the repository of a user.")
+@click.option("--config", type=Path)
+@click.option("--user", "-u", required=True, help="Owner of the repository.")
+@click.option("--name", default=None, help="Name of the top directory.")
+@click.option("--fan-out", type=int, default=10, help="Subdirectories per directory.")
+@click.option("--depth", type=int, default=3, help="Levels of subdirectories.")
+@click.option("--files", type=int, default=10, help="Files per directory.")
+@click.option(
+    "--file-size", type=int, default=64 << 10, help="Mean file size in bytes."
+)
+@click.option(
+    "--size-distribution",
+    type=click.Choice(["fixed", "uniform", "lognormal"]),
+    default="lognormal",
+)
+@click.option(
+    "--collisions",
+    type=float,
+    default=0.0,
+    help="Fraction of names that look like renamed conflicting copies.",
+)
+@click.option("--seed", type=int, default=None)
+@click.option(
+    "--metadata-only",
+    is_flag=True,
+    default=False,
+    help="Insert rows without creating files on disk.",
+)
+@click.option(
+    "--grow-capacity",
+    is_flag=True,
+    default=False,
+    help="Raise the repository capacity when the tree does not fit.",
+)
+def generate(
+    config: Path,
+    user: str,
+    name: Optional[str],
+    fan_out: int,
+    depth: int,
+    files: int,
+    file_size: int,
+    size_distribution: str,
+    collisions: float,
+    seed: Optional[int],
+    metadata_only: bool,
+    grow_capacity: bool,
+):
+    from pydantic import ValidationError
+    from materia.app.generate import GeneratorError, TreeShape, generate_tree
+    from materia.core import Database, DatabaseError, FileSystem
+    from materia.models import Repository, User
+
+    logger = Logger.new()
+    config = load_config(config, logger)
+
+    try:
+        shape = TreeShape(
+            fan_out=fan_out,
+            depth=depth,
+            files=files,
+            file_size=file_size,
+            size_distribution=size_distribution,
+            collisions=collisions,
+            seed=seed,
+        )
+    except ValidationError as e:
+        logger.error("{}", e)
+        sys.exit(1)
+
+    try:
+        os.chdir(config.application.working_directory.resolve())
+    except FileNotFoundError as e:
+        logger.error("Failed to change working directory: {}", e)
+        sys.exit(1)
+
+    logger.info(
+        "Generating {} directories and {} files",
+        shape.directories() + 1,
+        shape.files_count(),
+    )
+
+    async def main() -> dict:
+        database = await Database.new(config.database.url())
+        FileSystem.configure(config.application.io_threads)
+
+        try:
+            async with database.session() as session:
+                if not (owner := await User.by_name(user, session, with_lower=True)):
+                    raise GeneratorError(f"User {user} not found")
+                if not (repository := await Repository.from_user(owner, session)):
+                    repository = await Repository(
+                        user_id=owner.id, capacity=config.repository.capacity
+                    ).new(session, config)
+
+                result = await generate_tree(
+                    repository,
+                    shape,
+                    session,
+                    config,
+                    name=name,
+                    metadata_only=metadata_only,
+                    grow_capacity=grow_capacity,
+                )
+                await session.commit()
+
+                return result
+        finally:
+            await database.dispose()
+            FileSystem.shutdown()
+
+    started = time.monotonic()
+
+    try:
+        result = asyncio.run(main())
+    except (DatabaseError, GeneratorError) as e:
+        logger.error("{}", e)
+        sys.exit(1)
+
+    logger.info(
+        "Generated {} [seed {}] with {} bytes in {:.1f} s",
+        result["path"],
+        result["seed"],
+        result["size"],
+        time.monotonic() - started,
+    )
 
 
 @cli.group()
@@ -140,8 +452,7 @@ def export_openapi(path: Path):
     logger.info("Writing file at {}", path)
 
     try:
-        with open(path, "w") as io:
-            json.dump(app.backend.openapi(), io, sort_keys=False)
+        path.write_bytes(app.openapi())
     except Exception as e:
         logger.error("{}", e)
 
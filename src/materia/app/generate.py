@@ -0,0 +1,274 @@
+from asyncio import FIRST_COMPLETED
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path, PurePosixPath
+from time import time
+from typing import Iterator, Literal, Optional
+import asyncio
+import math
+import random
+
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncConnection
+import sqlalchemy as sa
+
+from materia.core import Config, FileSystem, SessionContext
+from materia.models import Directory, File, Repository
+
+directory_columns = [
+    "id",
+    "repository_id",
+    "parent_id",
+    "created",
+    "updated",
+    "name",
+    "is_public",
+    "version",
+]
+file_columns = [
+    "id",
+    "repository_id",
+    "parent_id",
+    "created",
+    "updated",
+    "name",
+    "is_public",
+    "size",
+]
+
+
+class GeneratorError(Exception):
+    pass
+
+
+class TreeShape(BaseModel):
+    """Generated tree: `fan_out` subdirectories in every directory down to
+    `depth` levels and `files` files in every directory, the top one
+    included, so `depth=0` is a single directory of files. A `collisions`
+    fraction of entries is named like the copies that a name conflict with
+    the first sibling produces, e.g. `file-0.3.bin`.
+    """
+
+    fan_out: int = Field(10, ge=1)
+    depth: int = Field(3, ge=0)
+    files: int = Field(10, ge=0)
+    file_size: int = Field(64 << 10, ge=0)
+    size_distribution: Literal["fixed", "uniform", "lognormal"] = "lognormal"
+    collisions: float = Field(0.0, ge=0, le=1)
+    seed: Optional[int] = None
+
+    def directories(self) -> int:
+        """Number of directories below the top one."""
+        return sum(self.fan_out**level for level in range(1, self.depth + 1))
+
+    def files_count(self) -> int:
+        return (self.directories() + 1) * self.files
+
+    def sample_size(self, rng: random.Random) -> int:
+        if self.size_distribution == "fixed":
+            return self.file_size
+        if self.size_distribution == "uniform":
+            return rng.randint(0, 2 * self.file_size)
+
+        # the mean of the distribution is the file size
+        sigma = 1.0
+        return int(
+            rng.lognormvariate(math.log(max(self.file_size, 1)) - sigma**2 / 2, sigma)
+        )
+
+    def entry_name(
+        self, rng: random.Random, prefix: str, index: int, suffix: str = ""
+    ) -> str:
+        if index and rng.random() < self.collisions:
+            return f"{prefix}-0.{index}{suffix}"
+
+        return f"{prefix}-{index}{suffix}"
+
+    def directory_names(self) -> Iterator[str]:
+        rng = random.Random(f"{self.seed}:directories")
+
+        for index in range(self.directories()):
+            yield self.entry_name(rng, "dir", index % self.fan_out)
+
+    def file_entries(self) -> Iterator[tuple[int, str, int]]:
+        """Directory index, the top directory being 0, name and size of every
+        file, the same on every call for a seed.
+        """
+        rng = random.Random(f"{self.seed}:files")
+
+        for directory in range(self.directories() + 1):
+            for index in range(self.files):
+                yield (
+                    directory,
+                    self.entry_name(rng, "file", index, ".bin"),
+                    self.sample_size(rng),
+                )
+
+
+async def reserve_ids(connection: AsyncConnection, table: str, count: int) -> int:
+    """First of `count` consecutive ids taken from the sequence of the table."""
+    if not count:
+        return 0
+
+    last = (
+        await connection.execute(
+            sa.text(
+                "select setval(pg_get_serial_sequence(:table, 'id'), "
+                "nextval(pg_get_serial_sequence(:table, 'id')) + :count - 1)"
+            ),
+            {"table": table, "count": count},
+        )
+    ).scalar_one()
+
+    return last - count + 1
+
+
+def make_directories(root: Path, paths: list[PurePosixPath]):
+    root.mkdir(exist_ok=True)
+
+    for path in paths:
+        root.joinpath(path).mkdir(parents=True, exist_ok=True)
+
+
+def write_sparse_files(directory: Path, files: list[tuple[str, int]]):
+    for name, size in files:
+        with open(directory.joinpath(name), "wb") as io:
+            io.truncate(size)
+
+
+async def materialize(
+    root: Path,
+    paths: list[PurePosixPath],
+    entries: Iterator[tuple[int, str, int]],
+    concurrency: int = 64,
+):
+    """Create the directories and sparse files of the tree under the root."""
+    await FileSystem.run(make_directories, root, paths)
+
+    pending = set()
+    for directory, files in groupby(entries, key=itemgetter(0)):
+        if len(pending) >= concurrency:
+            done, pending = await asyncio.wait(pending, return_when=FIRST_COMPLETED)
+            for task in done:
+                task.result()
+
+        pending.add(
+            asyncio.ensure_future(
+                FileSystem.run(
+                    write_sparse_files,
+                    root.joinpath(paths[directory]),
+                    [(name, size) for _, name, size in files],
+                )
+            )
+        )
+
+    await asyncio.gather(*pending)
+
+
+async def generate_tree(
+    repository: Repository,
+    shape: TreeShape,
+    session: SessionContext,
+    config: Config,
+    name: Optional[str] = None,
+    metadata_only: bool = False,
+    grow_capacity: bool = False,
+) -> dict:
+    """Add a generated tree in a new directory at the root of the repository,
+    named `generated-<seed>` by default. Rows are written with COPY and files
+    are created sparse, which takes seconds for a million entries. The caller
+    commits the session.
+
+    A tree that does not fit the capacity of the repository is rejected,
+    unless `grow_capacity` raises the capacity to fit it.
+    """
+    if shape.seed is None:
+        shape = shape.model_copy(update={"seed": random.randrange(1 << 32)})
+    name = name or f"generated-{shape.seed}"
+
+    if await Directory.by_path(repository, Path(name), session, config):
+        raise GeneratorError(f"Directory /{name} already exists")
+
+    connection = await session.connection()
+    # ids are reserved in blocks, concurrent inserts wait for the commit
+    await connection.execute(
+        sa.text("lock table directory, file in share row exclusive mode")
+    )
+
+    total_size = sum(size for _, _, size in shape.file_entries())
+    used = (
+        await connection.execute(
+            sa.select(sa.func.coalesce(sa.func.sum(File.size), 0)).where(
+                File.repository_id == repository.id
+            )
+        )
+    ).scalar_one()
+    if used + total_size > repository.capacity:
+        if not grow_capacity:
+            raise GeneratorError(
+                f"Tree of {total_size} bytes exceeds the remaining capacity "
+                f"of the repository, {repository.capacity - used} bytes"
+            )
+        repository.capacity = used + total_size
+
+    directories_count = shape.directories()
+    first_directory = await reserve_ids(connection, "directory", directories_count + 1)
+    first_file = await reserve_ids(connection, "file", shape.files_count())
+    now = int(time())
+
+    # level order starting with the top directory, the children of directory
+    # i are fan_out * i + j + 1
+    paths: list[PurePosixPath] = [PurePosixPath()]
+    directories = [(first_directory, repository.id, None, now, now, name, False, 0)]
+    for index, directory_name in enumerate(shape.directory_names()):
+        parent = index // shape.fan_out
+        paths.append(paths[parent].joinpath(directory_name))
+        directories.append(
+            (
+                first_directory + 1 + index,
+                repository.id,
+                first_directory + parent,
+                now,
+                now,
+                directory_name,
+                False,
+                0,
+            )
+        )
+
+    def files():
+        for index, (directory, file_name, size) in enumerate(shape.file_entries()):
+            yield (
+                first_file + index,
+                repository.id,
+                first_directory + directory,
+                now,
+                now,
+                file_name,
+                False,
+                size,
+            )
+
+    driver = (await connection.get_raw_connection()).driver_connection
+    await driver.copy_records_to_table(
+        "directory", records=directories, columns=directory_columns
+    )
+    await driver.copy_records_to_table("file", records=files(), columns=file_columns)
+
+    await connection.execute(
+        sa.update(Repository)
+        .where(Repository.id == repository.id)
+        .values(version=Repository.version + 1, capacity=repository.capacity)
+    )
+
+    if not metadata_only:
+        repository_path = await repository.real_path(session, config)
+        await materialize(repository_path.joinpath(name), paths, shape.file_entries())
+
+    return {
+        "path": f"/{name}",
+        "seed": shape.seed,
+        "directories": directories_count,
+        "files": shape.files_count(),
+        "size": total_size,
+    }
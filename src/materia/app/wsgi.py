@@ -1,10 +1,16 @@
-from gunicorn.app.wsgiapp import WSGIApplication
-import multiprocessing
+from gunicorn.app.base import BaseApplication
+from fastapi import FastAPI
 
 
-class MateriaProcessManager(WSGIApplication):
-    def __init__(self, app: str, options: dict | None = None):
-        self.app_uri = app 
+class MateriaProcessManager(BaseApplication):
+    """Gunicorn arbiter serving an already built application.
+
+    With `preload_app` the application is built once in the master process
+    and shared with forked workers; `SIGHUP` restarts workers gracefully.
+    """
+
+    def __init__(self, app: FastAPI, options: dict | None = None):
+        self.application = app
         self.options = options or {}
         super().__init__()
 
@@ -17,13 +23,5 @@ class MateriaProcessManager(WSGIApplication):
         for key, value in config.items():
             self.cfg.set(key.lower(), value)
 
-def run():
-    options = {
-        "bind": "0.0.0.0:8000",
-        "workers": (multiprocessing.cpu_count() * 2) + 1,
-        "worker_class": "materia.app.wsgi.MateriaWorker",
-        "raw_env": ["FOO=1"],
-        "user": None,
-        "group": None
-    }
-    MateriaProcessManager("materia.app.app:run", options).run()
+    def load(self) -> FastAPI:
+        return self.application
@@ -1,4 +1,5 @@
 from materia.core.logging import Logger, LoggerInstance, LogLevel, LogMode
+from materia.core import metrics
 from materia.core.database import (
     DatabaseError,
     DatabaseMigrationError,
@@ -6,8 +7,31 @@ from materia.core.database import (
     SessionMaker,
     SessionContext,
     ConnectionContext,
+    QueryStats,
+    query_stats,
+    read_primary,
+)
+from materia.core.filesystem import (
+    FileSystem,
+    FileSystemError,
+    TemporaryFileTarget,
+    ProgressCallback,
+    content_hash,
 )
-from materia.core.filesystem import FileSystem, FileSystemError, TemporaryFileTarget
 from materia.core.config import Config
 from materia.core.cache import Cache, CacheError
 from materia.core.cron import Cron, CronError
+from materia.core.profiling import (
+    Profiler,
+    ProfilingError,
+    ProfileFormat,
+    BlockingDetector,
+)
+from materia.core.compression import (
+    CompressionError,
+    compress,
+    compressible,
+    encodings,
+    negotiate,
+)
+from materia.core.assets import Asset, AssetManifest
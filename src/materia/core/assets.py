@@ -0,0 +1,111 @@
+from pathlib import Path
+from typing import Optional, Self
+import hashlib
+import mimetypes
+import os
+import re
+from uuid import uuid4
+from materia.core.compression import compress, compressible, encodings
+
+# names with a content hash, e.g. index-B5dGx3c1.js or bundle.fe8b6f2b.min.js
+hashed_name = re.compile(r"[.-](?=[A-Za-z_-]*\d)[A-Za-z0-9_]{8,}[.-]")
+
+
+class Asset:
+    """Static file with precomputed validators and compressed variants."""
+
+    def __init__(
+        self,
+        path: Path,
+        media_type: str,
+        etag: str,
+        modified: float,
+        immutable: bool,
+        variants: dict[str, Path],
+    ):
+        self.path = path
+        self.media_type = media_type
+        self.etag = etag
+        self.modified = modified
+        self.immutable = immutable
+        self.variants = variants
+
+    def cache_control(self) -> str:
+        if self.immutable:
+            return "public, max-age=31536000, immutable"
+
+        return "public, no-cache"
+
+
+class AssetManifest:
+    """Assets of a directory tree, scanned once.
+
+    Compressed variants of compressible files are written to the cache
+    directory under their ETag, so restarts and other workers reuse them.
+    Variants that are not smaller than the file are recorded by an empty
+    marker instead, so they are not compressed again on every start.
+    """
+
+    # moderate levels, a cold start compresses every asset
+    levels = {"zstd": 9, "br": 6, "gzip": 6}
+
+    def __init__(self, directory: Path, assets: dict[str, Asset]):
+        self.directory = directory
+        self.assets = assets
+
+    @staticmethod
+    def build(
+        directory: Path, cache_directory: Path, min_size: int = 1024
+    ) -> Self:
+        cache_directory.mkdir(parents=True, exist_ok=True)
+        assets = {}
+
+        for path in sorted(directory.rglob("*")):
+            if not path.is_file():
+                continue
+
+            data = path.read_bytes()
+            digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            variants = {}
+
+            if len(data) >= min_size and compressible(media_type):
+                for encoding in encodings():
+                    variant = cache_directory.joinpath(f"{digest}.{encoding}")
+                    incompressible = variant.with_name(f"{variant.name}.none")
+                    if incompressible.exists():
+                        continue
+                    if not variant.exists():
+                        compressed = compress(
+                            data, encoding, AssetManifest.levels[encoding]
+                        )
+                        if len(compressed) >= len(data):
+                            incompressible.touch()
+                            continue
+                        temporary = cache_directory.joinpath(f".{uuid4()}")
+                        temporary.write_bytes(compressed)
+                        os.replace(temporary, variant)
+                    variants[encoding] = variant
+
+            key = path.relative_to(directory).as_posix()
+            assets[key] = Asset(
+                path,
+                media_type,
+                f'"{digest}"',
+                path.stat().st_mtime,
+                bool(hashed_name.search(path.name)),
+                variants,
+            )
+
+        return AssetManifest(directory, assets)
+
+    def get(self, key: str) -> Optional[Asset]:
+        """Asset by its path relative to the directory, a directory path
+        resolves to its index.html.
+        """
+        key = key.strip("/")
+
+        if asset := self.assets.get(key):
+            return asset
+
+        return self.assets.get(f"{key}/index.html" if key else "index.html")
@@ -1,15 +1,28 @@
 from contextlib import asynccontextmanager
+from time import perf_counter
 from typing import Any, AsyncGenerator, Self
 from pydantic import RedisDsn
 from redis import asyncio as aioredis
 from redis.asyncio.client import Pipeline
 from materia.core.logging import Logger
+from materia.core import metrics
 
 
 class CacheError(Exception):
     pass
 
 
+class InstrumentedRedis(aioredis.Redis):
+    async def execute_command(self, *args, **options):
+        start = perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            metrics.cache_command_duration.labels(str(args[0]).upper()).observe(
+                perf_counter() - start
+            )
+
+
 class Cache:
     def __init__(self, url: RedisDsn, pool: aioredis.ConnectionPool):
         self.url: RedisDsn = url
@@ -39,10 +52,13 @@ class Cache:
 
         return Cache(url=url, pool=pool)
 
+    async def dispose(self):
+        await self.pool.disconnect()
+
     @asynccontextmanager
     async def client(self) -> AsyncGenerator[aioredis.Redis, Any]:
         try:
-            yield aioredis.Redis(connection_pool=self.pool)
+            yield InstrumentedRedis(connection_pool=self.pool)
         except Exception as e:
             raise CacheError(f"{e}")
 
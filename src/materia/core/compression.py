@@ -0,0 +1,86 @@
+from typing import Optional
+import gzip
+
+try:
+    import brotli
+except ModuleNotFoundError:
+    brotli = None
+
+try:
+    import zstandard
+except ModuleNotFoundError:
+    zstandard = None
+
+
+class CompressionError(Exception):
+    pass
+
+
+def encodings() -> list[str]:
+    """Supported content codings in the order of preference."""
+    return (["zstd"] if zstandard else []) + (["br"] if brotli else []) + ["gzip"]
+
+
+def compressible(media_type: Optional[str]) -> bool:
+    """Whether the media type is worth compressing, compressed formats like
+    images, archives and video are not.
+    """
+    if not media_type:
+        return False
+
+    media_type = media_type.split(";", 1)[0].strip().lower()
+
+    return (
+        media_type.startswith("text/")
+        or media_type.endswith(("+json", "+xml"))
+        or media_type
+        in (
+            "application/json",
+            "application/javascript",
+            "application/xml",
+            "application/wasm",
+            "image/svg+xml",
+        )
+    )
+
+
+def negotiate(accept_encoding: Optional[str], available: list[str]) -> Optional[str]:
+    """Pick the available coding with the highest quality in Accept-Encoding,
+    ties go to the earlier one in `available`.
+    """
+    if not accept_encoding:
+        return None
+
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.strip().lower().split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip()] = quality
+
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+
+    return best
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == "zstd" and zstandard:
+        return zstandard.ZstdCompressor(level=19 if level is None else level).compress(
+            data
+        )
+    if encoding == "br" and brotli:
+        return brotli.compress(data, quality=11 if level is None else level)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9 if level is None else level)
+
+    raise CompressionError(f"Unsupported content coding: {encoding}")
@@ -1,14 +1,33 @@
-from typing import Optional, Self
-from celery import Celery
+from time import perf_counter
+from typing import Literal, Optional, Self
+from celery import Celery, signals
 from pydantic import RedisDsn
 from threading import Thread
+from materia.core.config import Config
 from materia.core.logging import Logger
+from materia.core import metrics
 
 
 class CronError(Exception):
     pass
 
 
+_task_started: dict[str, float] = {}
+
+
+@signals.task_prerun.connect
+def _on_task_prerun(task_id: str, **kwargs):
+    _task_started[task_id] = perf_counter()
+
+
+@signals.task_postrun.connect
+def _on_task_postrun(task_id: str, task, state: Optional[str] = None, **kwargs):
+    if (started := _task_started.pop(task_id, None)) is not None:
+        metrics.cron_task_duration.labels(task.name, state or "UNKNOWN").observe(
+            perf_counter() - started
+        )
+
+
 class Cron:
     __instance__: Optional[Self] = None
 
@@ -16,9 +35,14 @@ class Cron:
         self,
         workers_count: int,
         backend: Celery,
+        queues: list[str] = ["celery"],
+        config: Optional[Config] = None,
     ):
         self.workers_count = workers_count
         self.backend = backend
+        self.queues = queues
+        # tasks read settings here instead of receiving them through the broker
+        self.config = config
         self.workers = []
         self.worker_threads = []
 
@@ -30,6 +54,10 @@ class Cron:
         backend_url: Optional[RedisDsn] = None,
         broker_url: Optional[RedisDsn] = None,
         test_connection: bool = True,
+        prefetch_multiplier: int = 4,
+        queues: list[str] = ["celery"],
+        routes: dict[str, str] = {},
+        config: Optional[Config] = None,
         **kwargs,
     ):
         cron = Cron(
@@ -44,13 +72,15 @@ class Cron:
                 broker_connection_retry_on_startup=True,
                 task_serializer="pickle",
                 accept_content=["pickle", "json"],
+                task_default_queue=queues[0] if queues else "celery",
+                task_routes={task: {"queue": queue} for task, queue in routes.items()},
+                worker_prefetch_multiplier=prefetch_multiplier,
                 **kwargs,
             ),
+            queues,
+            config,
         )
 
-        for _ in range(workers_count):
-            cron.workers.append(cron.backend.Worker())
-
         if test_connection:
             try:
                 if logger := Logger.instance():
@@ -65,8 +95,54 @@ class Cron:
     def instance() -> Optional[Self]:
         return Cron.__instance__
 
+    @staticmethod
+    def config_instance() -> Config:
+        """Configuration of the worker process, or the one from the
+        environment when the worker was started without it.
+        """
+        if (cron := Cron.instance()) and cron.config:
+            return cron.config
+
+        return Config()
+
+    def dispose(self):
+        """Close the broker and result backend connections, e.g. before the
+        process forks.
+        """
+        self.backend.close()
+        if (client := getattr(self.backend.backend, "client", None)) is not None:
+            client.connection_pool.disconnect()
+
+        if Cron.__instance__ is self:
+            Cron.__instance__ = None
+
     def run_workers(self):
+        """Run workers as daemon threads of the current process."""
+        for _ in range(self.workers_count):
+            self.workers.append(self.backend.Worker(queues=self.queues))
+
         for worker in self.workers:
             thread = Thread(target=worker.start, daemon=True)
             self.worker_threads.append(thread)
             thread.start()
+
+    def run_worker_pool(
+        self,
+        pool: Literal["prefork", "processes", "threads", "solo"] = "prefork",
+        concurrency: Optional[int] = None,
+        loglevel: str = "info",
+    ):
+        """Run a standalone worker with its own execution pool.
+        Blocks until the worker is stopped.
+        """
+        worker = self.backend.Worker(
+            pool_cls=pool,
+            concurrency=concurrency,
+            queues=self.queues,
+            loglevel=loglevel.upper(),
+        )
+        self.workers.append(worker)
+        worker.start()
+
+        if worker.exitcode:
+            raise CronError(f"Cron worker exited with code {worker.exitcode}")
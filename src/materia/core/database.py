@@ -1,8 +1,13 @@
 from contextlib import asynccontextmanager
-from typing import AsyncIterator, Self, TypeAlias
+from contextvars import ContextVar
+from functools import cache
+from time import perf_counter
+from typing import TYPE_CHECKING, AsyncIterator, Optional, Self, TypeAlias
 from pathlib import Path
 
 from pydantic import PostgresDsn, ValidationError
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
     AsyncEngine,
@@ -10,15 +15,15 @@ from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, AsyncAdaptedQueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue
 from asyncpg import Connection
-from alembic.config import Config as AlembicConfig
-from alembic.operations import Operations
-from alembic.runtime.migration import MigrationContext
-from alembic.script.base import ScriptDirectory
-import alembic_postgresql_enum
 from fastapi import HTTPException
 from materia.core.logging import Logger
+from materia.core import metrics
+
+if TYPE_CHECKING:
+    from alembic.script.base import ScriptDirectory
 
 
 class DatabaseError(Exception):
@@ -29,63 +34,240 @@ class DatabaseMigrationError(Exception):
     pass
 
 
+@cache
+def migration_script() -> "ScriptDirectory":
+    """Migration scripts of the package, loaded once per process."""
+    from alembic.config import Config as AlembicConfig
+    from alembic.script.base import ScriptDirectory
+
+    aconfig = AlembicConfig()
+    aconfig.set_main_option(
+        "script_location",
+        str(Path(__file__).parent.parent.joinpath("models", "migrations")),
+    )
+
+    return ScriptDirectory.from_config(aconfig)
+
+
 SessionContext: TypeAlias = AsyncIterator[AsyncSession]
 SessionMaker: TypeAlias = async_sessionmaker[AsyncSession]
 ConnectionContext: TypeAlias = AsyncIterator[AsyncConnection]
 
 
+class QueryStats:
+    """Statements executed on behalf of a single request."""
+
+    def __init__(self, request_id: str):
+        self.request_id: str = request_id
+        self.count: int = 0
+        self.duration: float = 0.0
+
+
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+# set for requests of clients that wrote within the read-your-writes window
+read_primary: ContextVar[bool] = ContextVar("read_primary", default=False)
+
+
+def instrument_engine(engine: AsyncEngine, slow_query_threshold: Optional[float] = None):
+    """Time every statement of the engine, account it to the current
+    request and log statements slower than the threshold (seconds).
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        context._query_start = perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        elapsed = perf_counter() - context._query_start
+        metrics.database_query_duration.observe(elapsed)
+
+        if stats := query_stats.get():
+            stats.count += 1
+            stats.duration += elapsed
+
+        if slow_query_threshold is not None and elapsed >= slow_query_threshold:
+            if logger := Logger.instance():
+                logger.warning(
+                    "Slow query [{}] {:.1f} ms: {}",
+                    stats.request_id if stats else "-",
+                    elapsed * 1000,
+                    statement,
+                )
+
+
+class MeasuredQueue(AsyncAdaptedQueue):
+    """Queue of pooled connections that keeps track of the time spent
+    waiting for a free connection. Opening new connections is not counted.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_count: int = 0
+        self.wait_time: float = 0.0
+        self.wait_time_max: float = 0.0
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        start = perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            elapsed = perf_counter() - start
+            self.wait_count += 1
+            self.wait_time += elapsed
+            self.wait_time_max = max(self.wait_time_max, elapsed)
+
+
+class MeasuredPool(AsyncAdaptedQueuePool):
+    """Queue pool that keeps track of the time spent waiting for connections."""
+
+    _queue_class = MeasuredQueue
+
+    @property
+    def wait_count(self) -> int:
+        return self._pool.wait_count
+
+    @property
+    def wait_time(self) -> float:
+        return self._pool.wait_time
+
+    @property
+    def wait_time_max(self) -> float:
+        return self._pool.wait_time_max
+
+
 class Database:
     def __init__(
         self,
         url: PostgresDsn,
         engine: AsyncEngine,
         sessionmaker: SessionMaker,
+        replicas: list[tuple[AsyncEngine, SessionMaker]] = [],
     ):
         self.url: PostgresDsn = url
         self.engine: AsyncEngine = engine
         self.sessionmaker: SessionMaker = sessionmaker
+        self.replicas: list[tuple[AsyncEngine, SessionMaker]] = replicas
+        self._replica_index: int = 0
 
     @staticmethod
     async def new(
         url: PostgresDsn,
-        pool_size: int = 100,
+        pool_size: int = 20,
+        max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        statement_cache_size: int = 100,
+        prepared_statement_cache_size: int = 100,
+        replicas: list[PostgresDsn] = [],
+        slow_query_threshold: Optional[float] = None,
         poolclass=None,
         autocommit: bool = False,
         autoflush: bool = False,
         expire_on_commit: bool = False,
         test_connection: bool = True,
     ) -> Self:
-        engine_options = {"pool_size": pool_size}
+        engine_options = {
+            "poolclass": MeasuredPool,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+        }
         if poolclass == NullPool:
             engine_options = {"poolclass": NullPool}
 
-        engine = create_async_engine(str(url), **engine_options)
+        def make_engine(url: PostgresDsn) -> tuple[AsyncEngine, SessionMaker]:
+            engine = create_async_engine(
+                str(url),
+                pool_pre_ping=pool_pre_ping,
+                connect_args={
+                    "statement_cache_size": statement_cache_size,
+                    "prepared_statement_cache_size": prepared_statement_cache_size,
+                },
+                **engine_options,
+            )
+            instrument_engine(engine, slow_query_threshold)
+            sessionmaker = async_sessionmaker(
+                bind=engine,
+                autocommit=autocommit,
+                autoflush=autoflush,
+                expire_on_commit=expire_on_commit,
+            )
 
-        sessionmaker = async_sessionmaker(
-            bind=engine,
-            autocommit=autocommit,
-            autoflush=autoflush,
-            expire_on_commit=expire_on_commit,
-        )
+            return engine, sessionmaker
 
-        database = Database(url=url, engine=engine, sessionmaker=sessionmaker)
+        engine, sessionmaker = make_engine(url)
+
+        database = Database(
+            url=url,
+            engine=engine,
+            sessionmaker=sessionmaker,
+            replicas=[make_engine(replica_url) for replica_url in replicas],
+        )
 
         if test_connection:
-            try:
-                if logger := Logger.instance():
-                    logger.debug("Testing database connection")
-                async with database.connection() as connection:
-                    await connection.rollback()
-            except Exception as e:
-                raise DatabaseError(
-                    f"Failed to connect to database '{url}': {e}"
-                ) from e
+            for test_engine in [engine, *(engine for engine, _ in database.replicas)]:
+                try:
+                    if logger := Logger.instance():
+                        logger.debug("Testing database connection")
+                    async with test_engine.connect() as connection:
+                        await connection.rollback()
+                except Exception as e:
+                    raise DatabaseError(
+                        f"Failed to connect to database '{test_engine.url}': {e}"
+                    ) from e
 
         return database
 
     async def dispose(self):
         await self.engine.dispose()
 
+        for engine, _ in self.replicas:
+            await engine.dispose()
+
+    @staticmethod
+    def engine_pool_status(engine: AsyncEngine) -> dict:
+        pool = engine.pool
+
+        if not isinstance(pool, MeasuredPool):
+            return {"pool": type(pool).__name__}
+
+        return {
+            "pool": type(pool).__name__,
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "wait_count": pool.wait_count,
+            "wait_time": pool.wait_time,
+            "wait_time_max": pool.wait_time_max,
+        }
+
+    def pool_status(self) -> dict:
+        status = Database.engine_pool_status(self.engine)
+
+        if self.replicas:
+            status["replicas"] = [
+                Database.engine_pool_status(engine) for engine, _ in self.replicas
+            ]
+
+        return status
+
+    def route(self, readonly: bool = False) -> SessionMaker:
+        """Select a session maker for the next session.
+        Read-only sessions are balanced across replicas unless the current
+        request is marked with `read_primary`.
+        """
+        if not readonly or not self.replicas or read_primary.get():
+            return self.sessionmaker
+
+        self._replica_index = (self._replica_index + 1) % len(self.replicas)
+
+        return self.replicas[self._replica_index][1]
+
     @asynccontextmanager
     async def connection(self) -> ConnectionContext:
         async with self.engine.connect() as connection:
@@ -96,8 +278,9 @@ class Database:
                 raise DatabaseError(*e.args) from e
 
     @asynccontextmanager
-    async def session(self) -> SessionContext:
-        session = self.sessionmaker()
+    async def session(self, readonly: bool = False) -> SessionContext:
+        sessionmaker = self.route(readonly)
+        session = sessionmaker()
 
         try:
             yield session
@@ -110,22 +293,21 @@ class Database:
         finally:
             await session.close()
 
-    def run_sync_migrations(self, connection: Connection):
+    def migrate_sync(self, connection: Connection, destination: str):
+        from alembic.operations import Operations
+        from alembic.runtime.migration import MigrationContext
+        import alembic_postgresql_enum
         from materia.models.base import Base
 
-        aconfig = AlembicConfig()
-        aconfig.set_main_option("sqlalchemy.url", str(self.url))
-        aconfig.set_main_option(
-            "script_location",
-            str(Path(__file__).parent.parent.joinpath("models", "migrations")),
-        )
-
+        script = migration_script()
         context = MigrationContext.configure(
             connection=connection,  # type: ignore
             opts={
                 "target_metadata": Base.metadata,
-                "fn": lambda rev, _: ScriptDirectory.from_config(aconfig)._upgrade_revs(
-                    "head", rev
+                "fn": lambda rev, _: (
+                    script._downgrade_revs(destination, rev)
+                    if destination == "base"
+                    else script._upgrade_revs(destination, rev)
                 ),
             },
         )
@@ -137,36 +319,34 @@ class Database:
         except Exception as e:
             raise DatabaseMigrationError(f"{e}")
 
-    async def run_migrations(self):
-        async with self.connection() as connection:
-            await connection.run_sync(self.run_sync_migrations)  # type: ignore
+    def run_sync_migrations(self, connection: Connection):
+        self.migrate_sync(connection, "head")
 
     def rollback_sync_migrations(self, connection: Connection):
-        from materia.models.base import Base
+        self.migrate_sync(connection, "base")
 
-        aconfig = AlembicConfig()
-        aconfig.set_main_option("sqlalchemy.url", str(self.url))
-        aconfig.set_main_option(
-            "script_location",
-            str(Path(__file__).parent.parent.joinpath("models", "migrations")),
-        )
+    async def revisions(self) -> set[str]:
+        """Revisions the database schema is at, empty when it is not
+        versioned yet.
+        """
+        async with self.engine.connect() as connection:
+            try:
+                result = await connection.execute(
+                    text("select version_num from alembic_version")
+                )
+            except DBAPIError:
+                return set()
 
-        context = MigrationContext.configure(
-            connection=connection,  # type: ignore
-            opts={
-                "target_metadata": Base.metadata,
-                "fn": lambda rev, _: ScriptDirectory.from_config(
-                    aconfig
-                )._downgrade_revs("base", rev),
-            },
-        )
+            return set(result.scalars())
 
-        try:
-            with context.begin_transaction():
-                with Operations.context(context):
-                    context.run_migrations()
-        except Exception as e:
-            raise DatabaseMigrationError(f"{e}")
+    async def run_migrations(self):
+        if await self.revisions() == set(migration_script().get_heads()):
+            if logger := Logger.instance():
+                logger.debug("Database schema is up to date")
+            return
+
+        async with self.connection() as connection:
+            await connection.run_sync(self.run_sync_migrations)  # type: ignore
 
     async def rollback_migrations(self):
         async with self.connection() as connection:
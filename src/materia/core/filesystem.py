@@ -1,24 +1,59 @@
-from typing import Optional, Self, Iterator, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, ParamSpec, Self, Iterator, TypeAlias, TypeVar
 from pathlib import Path
-import aiofiles
-from aiofiles import os as async_os
-from aiofiles import ospath as async_path
-import aioshutil
+import asyncio
+import hashlib
+import os
+import shutil
 import re
-from tempfile import NamedTemporaryFile
 from streaming_form_data.targets import BaseTarget
 from uuid import uuid4
 from materia.core.misc import optional
+from materia.core.metrics import timed
+
+try:
+    from blake3 import blake3
+except ModuleNotFoundError:
+    blake3 = None
 
 
 valid_path = re.compile(r"^/(.*/)*([^/]*)$")
 
+# Called with the number of processed entries and bytes since the last call.
+ProgressCallback: TypeAlias = Callable[[int, int], None]
+
+T = TypeVar("T")
+P = ParamSpec("P")
+
 
 class FileSystemError(Exception):
     pass
 
 
+def content_hasher():
+    """Incremental hash of file contents, BLAKE3 if installed or SHA-256."""
+    return blake3() if blake3 else hashlib.sha256()
+
+
+def content_hash(data: Optional[bytes] = None, hasher=None) -> str:
+    """Hash of the data or digest of a hasher prefixed with the algorithm,
+    e.g. `sha256:<hex>`.
+    """
+    if hasher is None:
+        hasher = content_hasher()
+        hasher.update(data or b"")
+
+    return f"{hasher.name}:{hasher.hexdigest()}"
+
+
 class FileSystem:
+    # Blocking calls of all instances share one bounded pool, so a slow disk
+    # occupies at most `max_workers` threads instead of the event loop or the
+    # default executor.
+    _executor: Optional[ThreadPoolExecutor] = None
+    _max_workers: int = 16
+
     def __init__(self, path: Path, isolated_directory: Optional[Path] = None):
         if path == Path() or path is None:
             raise FileSystemError("The given path is empty")
@@ -32,17 +67,44 @@ class FileSystem:
         # self.working_directory = working_directory
         # self.relative_path = path.relative_to(working_directory)
 
+    @staticmethod
+    def configure(max_workers: int):
+        FileSystem.shutdown()
+        FileSystem._max_workers = max_workers
+
+    @staticmethod
+    def executor() -> ThreadPoolExecutor:
+        if FileSystem._executor is None:
+            FileSystem._executor = ThreadPoolExecutor(
+                FileSystem._max_workers, thread_name_prefix="materia-io"
+            )
+
+        return FileSystem._executor
+
+    @staticmethod
+    def shutdown():
+        if FileSystem._executor is not None:
+            FileSystem._executor.shutdown(wait=False)
+            FileSystem._executor = None
+
+    @staticmethod
+    async def run(func: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+        """Run a blocking function in the filesystem executor."""
+        return await asyncio.get_running_loop().run_in_executor(
+            FileSystem.executor(), partial(func, *args, **kwargs)
+        )
+
     async def exists(self) -> bool:
-        return await async_path.exists(self.path)
+        return await FileSystem.run(self.path.exists)
 
     async def size(self) -> int:
-        return await async_path.getsize(self.path)
+        return await FileSystem.run(os.path.getsize, self.path)
 
     async def is_file(self) -> bool:
-        return await async_path.isfile(self.path)
+        return await FileSystem.run(self.path.is_file)
 
     async def is_directory(self) -> bool:
-        return await async_path.isdir(self.path)
+        return await FileSystem.run(self.path.is_dir)
 
     def name(self) -> str:
         return self.path.name
@@ -50,7 +112,7 @@ class FileSystem:
     async def check_isolation(self, path: Path):
         if not self.isolated_directory:
             return
-        if not (await async_path.exists(self.isolated_directory)):
+        if not (await FileSystem.run(self.isolated_directory.exists)):
             raise FileSystemError("Missed isolated directory")
         if not optional(path.relative_to, self.isolated_directory):
             raise FileSystemError(
@@ -59,24 +121,28 @@ class FileSystem:
         if self.path == self.isolated_directory:
             raise FileSystemError("Attempting to modify the isolated directory")
 
+    def _remove(self):
+        if self.path.is_file():
+            os.remove(self.path)
+        elif self.path.is_dir():
+            shutil.rmtree(str(self.path))
+
+    @timed("remove")
     async def remove(self, shallow: bool = False):
         await self.check_isolation(self.path)
         try:
-            if await self.exists() and await self.is_file() and not shallow:
-                await aiofiles.os.remove(self.path)
-
-            if await self.exists() and await self.is_directory() and not shallow:
-                await aioshutil.rmtree(str(self.path))
+            if not shallow:
+                await FileSystem.run(self._remove)
         except OSError as e:
             raise FileSystemError(*e.args) from e
 
-    async def generate_name(self, target_directory: Path, name: str) -> str:
-        """Generate name based on target directory contents and self type."""
+    def _generate_name(self, target_directory: Path, name: str) -> str:
         count = 1
         new_path = target_directory.joinpath(name)
+        is_file, is_directory = self.path.is_file(), self.path.is_dir()
 
-        while await async_path.exists(new_path):
-            if await self.is_file():
+        while new_path.exists():
+            if is_file:
                 if with_counter := re.match(r"^(.+)\.(\d+)\.(\w+)$", new_path.name):
                     new_name, _, extension = with_counter.groups()
                 elif with_extension := re.match(r"^(.+)\.(\w+)$", new_path.name):
@@ -86,7 +152,7 @@ class FileSystem:
                     "{}.{}.{}".format(new_name, count, extension)
                 )
 
-            if await self.is_directory():
+            if is_directory:
                 if with_counter := re.match(r"^(.+)\.(\d+)$", new_path.name):
                     new_name, _ = with_counter.groups()
                 else:
@@ -98,6 +164,10 @@ class FileSystem:
 
         return new_path.name
 
+    async def generate_name(self, target_directory: Path, name: str) -> str:
+        """Generate name based on target directory contents and self type."""
+        return await FileSystem.run(self._generate_name, target_directory, name)
+
     async def _generate_new_path(
         self,
         target_directory: Path,
@@ -107,7 +177,7 @@ class FileSystem:
     ) -> Path:
         new_name = new_name or self.path.name
 
-        if await async_path.exists(target_directory.joinpath(new_name)):
+        if await FileSystem.run(target_directory.joinpath(new_name).exists):
             if force or shallow:
                 new_name = await self.generate_name(target_directory, new_name)
             else:
@@ -115,6 +185,11 @@ class FileSystem:
 
         return target_directory.joinpath(new_name)
 
+    def _move(self, new_path: Path):
+        if self.path.exists():
+            shutil.move(self.path, new_path)
+
+    @timed("move")
     async def move(
         self,
         target_directory: Path,
@@ -129,8 +204,8 @@ class FileSystem:
         target = FileSystem(new_path, self.isolated_directory)
 
         try:
-            if await self.exists() and not shallow:
-                await aioshutil.move(self.path, new_path)
+            if not shallow:
+                await FileSystem.run(self._move, new_path)
         except Exception as e:
             raise FileSystemError(*e.args) from e
 
@@ -143,12 +218,25 @@ class FileSystem:
             self.path.parent, new_name=new_name, force=force, shallow=shallow
         )
 
+    def _copy(self, new_path: Path, progress: Optional[ProgressCallback] = None):
+        def copy_function(src: str, dst: str):
+            shutil.copy2(src, dst)
+            if progress:
+                progress(0, os.path.getsize(dst))
+
+        if self.path.is_file():
+            copy_function(self.path, new_path)
+        elif self.path.is_dir():
+            shutil.copytree(self.path, new_path, copy_function=copy_function)
+
+    @timed("copy")
     async def copy(
         self,
         target_directory: Path,
         new_name: Optional[str] = None,
         force: bool = False,
         shallow: bool = False,
+        progress: Optional[ProgressCallback] = None,
     ) -> Self:
         await self.check_isolation(self.path)
         new_path = await self._generate_new_path(
@@ -157,32 +245,37 @@ class FileSystem:
         target = FileSystem(new_path, self.isolated_directory)
 
         try:
-            if await self.is_file() and not shallow:
-                await aioshutil.copy(self.path, new_path)
-
-            if await self.is_directory() and not shallow:
-                await aioshutil.copytree(self.path, new_path)
+            if not shallow:
+                await FileSystem.run(self._copy, new_path, progress)
         except Exception as e:
             raise FileSystemError(*e.args) from e
 
         return target
 
+    def _make_directory(self, force: bool):
+        if self.path.exists() and not force:
+            raise FileSystemError("Already exists")
+
+        os.makedirs(self.path, exist_ok=force)
+
+    @timed("make_directory")
     async def make_directory(self, force: bool = False):
         try:
-            if await self.exists() and not force:
-                raise FileSystemError("Already exists")
-
-            await async_os.makedirs(self.path, exist_ok=force)
+            await FileSystem.run(self._make_directory, force)
         except Exception as e:
             raise FileSystemError(*e.args)
 
+    def _write_file(self, data: bytes, force: bool):
+        if self.path.exists() and not force:
+            raise FileSystemError("Already exists")
+
+        with open(self.path, mode="wb") as file:
+            file.write(data)
+
+    @timed("write_file")
     async def write_file(self, data: bytes, force: bool = False):
         try:
-            if await self.exists() and not force:
-                raise FileSystemError("Already exists")
-
-            async with aiofiles.open(self.path, mode="wb") as file:
-                await file.write(data)
+            await FileSystem.run(self._write_file, data, force)
         except Exception as e:
             raise FileSystemError(*e.args)
 
@@ -199,9 +292,28 @@ class FileSystem:
         return Path(*path.resolve().parts[1:])
 
 
+# executor threads do not survive fork, children create their own pool
+os.register_at_fork(after_in_child=lambda: setattr(FileSystem, "_executor", None))
+
+
 class TemporaryFileTarget(BaseTarget):
+    """Multipart target for a file in the cache directory.
+
+    Parser callbacks only collect data. `flush` hands it over in blocks of
+    `buffer_size` to a writer task through a queue of `queue_size` blocks,
+    so the disk writes overlap with reading the request and a slow disk
+    pauses the upload instead of growing memory. The writer hashes blocks
+    as it writes them.
+    """
+
     def __init__(
-        self, working_directory: Path, allow_overwrite: bool = True, *args, **kwargs
+        self,
+        working_directory: Path,
+        allow_overwrite: bool = True,
+        *args,
+        buffer_size: int = 1 << 20,
+        queue_size: int = 4,
+        **kwargs,
     ):
         if working_directory == Path():
             raise FileSystemError("The given working directory is empty")
@@ -211,25 +323,91 @@ class TemporaryFileTarget(BaseTarget):
         self._mode = "wb" if allow_overwrite else "xb"
         self._fd = None
         self._path = working_directory.joinpath("cache", str(uuid4()))
-
-    def on_start(self):
-        if not self._path.parent.exists():
-            self._path.parent.mkdir(exist_ok=True)
-
-        self._fd = open(str(self._path), mode="wb")
+        self._buffer = bytearray()
+        self._buffer_size = buffer_size
+        self._queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(queue_size)
+        self._writer: Optional[asyncio.Task] = None
+        self._error: Optional[Exception] = None
+        self._hasher = content_hasher()
 
     def on_data_received(self, chunk: bytes):
-        if self._fd:
-            self._fd.write(chunk)
+        self._buffer += chunk
 
-    def on_finish(self):
+    def _write(self, block: bytes):
+        if self._fd is None:
+            self._path.parent.mkdir(exist_ok=True)
+            self._fd = open(str(self._path), mode="wb")
+
+        self._fd.write(block)
+        self._hasher.update(block)
+
+    async def _write_blocks(self):
+        while (block := await self._queue.get()) is not None:
+            # keep draining after a failure so that producers never block
+            if self._error is None:
+                try:
+                    await FileSystem.run(self._write, block)
+                except Exception as e:
+                    self._error = e
+
+    async def _put(self, block: Optional[bytes]):
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_blocks())
+
+        await self._queue.put(block)
+
+        if self._error is not None:
+            raise FileSystemError(*self._error.args) from self._error
+
+    async def flush(self):
+        """Queue collected data in whole blocks."""
+        if (size := len(self._buffer)) >= self._buffer_size:
+            size -= size % self._buffer_size
+            block = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            await self._put(block)
+
+    def _close(self):
+        if self._started and self._fd is None:
+            self._write(b"")
         if self._fd:
             self._fd.close()
 
+    async def close(self):
+        """Write remaining data and close the file."""
+        if self._buffer:
+            block = bytes(self._buffer)
+            self._buffer.clear()
+            await self._put(block)
+
+        if self._writer is not None:
+            await self._queue.put(None)
+            await self._writer
+
+        if self._error is not None:
+            raise FileSystemError(*self._error.args) from self._error
+
+        await FileSystem.run(self._close)
+
     def path(self) -> Optional[Path]:
         return self._path
 
-    def remove(self):
+    def content_hash(self) -> str:
+        """Hash of the written contents, complete after `close`."""
+        return content_hash(hasher=self._hasher)
+
+    def _remove(self):
         if self._fd:
+            self._fd.close()
             if (path := Path(self._fd.name)).exists():
                 path.unlink()
+
+    async def remove(self):
+        self._buffer.clear()
+        if self._writer is not None and not self._writer.done():
+            # let a running write finish before the file is closed
+            self._error = self._error or FileSystemError("Upload is aborted")
+            await self._queue.put(None)
+            await self._writer
+
+        await FileSystem.run(self._remove)
@@ -1,8 +1,14 @@
 import sys
-from typing import Sequence, Literal, Optional, TypeAlias
+from typing import Sequence, Literal, Optional, TextIO, TypeAlias
 from pathlib import Path
+from queue import Queue, Full
+from random import random
+from threading import Thread
 from loguru import logger
 from loguru._logger import Logger as LoggerInstance
+import atexit
+import copy
+import os
 import logging
 import inspect
 
@@ -25,6 +31,113 @@ class InterceptHandler(logging.Handler):
         )
 
 
+class AccessInterceptHandler(logging.Handler):
+    """Cheap interception for access logs: no frame walk, optional sampling."""
+
+    def __init__(self, sample_rate: float = 1.0, level: int = logging.NOTSET):
+        super().__init__(level)
+        self.sample_rate = sample_rate
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.sample_rate < 1.0 and random() >= self.sample_rate:
+            return
+
+        logger.opt(exception=record.exc_info).log(
+            record.levelname, record.getMessage()
+        )
+
+
+class QueueSink:
+    """Write messages to a stream from a background thread.
+    The queue is bounded: when the writer falls behind, messages are dropped
+    instead of blocking the caller.
+
+    Use `QueueSink.of` to share one sink, and its thread, per stream.
+    """
+
+    instances: dict[int, "QueueSink"] = {}
+
+    def __init__(self, stream: TextIO, maxsize: int = 10000):
+        self.stream = stream
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.start()
+
+        atexit.register(self.stop)
+        # threads do not survive fork, e.g. in server workers
+        os.register_at_fork(after_in_child=self.start)
+
+    @staticmethod
+    def of(stream: TextIO, maxsize: int = 10000) -> "QueueSink":
+        """Sink of the stream, created on the first call. Loggers are made
+        again on reconfiguration, the sink and its exit and fork hooks are not.
+        """
+        if (sink := QueueSink.instances.get(id(stream))) is None:
+            sink = QueueSink.instances[id(stream)] = QueueSink(stream, maxsize)
+
+        return sink
+
+    def start(self):
+        self.queue: Queue[Optional[str]] = Queue(maxsize=self.maxsize)
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __call__(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except Full:
+            self.dropped += 1
+
+    def run(self):
+        while (message := self.queue.get()) is not None:
+            self.stream.write(message)
+
+            if self.queue.empty():
+                self.stream.flush()
+
+    def stop(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+
+
+class LogFile:
+    """Stream over a loguru file sink, to keep its rotation and retention
+    behind a `QueueSink`. The sink belongs to an independent copy of the
+    logger, so the formatted messages are written as they are.
+
+    Use `LogFile.of` to share one stream per file.
+    """
+
+    instances: dict[tuple[str, str, str], "LogFile"] = {}
+
+    def __init__(self, path: str, rotation: str, retention: str):
+        # copying requires a logger without handlers
+        self.logger = copy.deepcopy(logger)
+        self.logger.remove()
+        self.logger.add(
+            path,
+            rotation=rotation,
+            retention=retention,
+            level=0,
+            format="{message}",
+        )
+
+    @staticmethod
+    def of(path: str, rotation: str, retention: str) -> "LogFile":
+        key = (path, rotation, retention)
+        if (stream := LogFile.instances.get(key)) is None:
+            stream = LogFile.instances[key] = LogFile(path, rotation, retention)
+
+        return stream
+
+    def write(self, message: str):
+        self.logger.opt(raw=True).log("INFO", message)
+
+    def flush(self):
+        pass
+
+
 LogLevel: TypeAlias = Literal["info", "warning", "error", "critical", "debug", "trace"]
 LogMode: TypeAlias = Literal["console", "file", "all"]
 
@@ -48,9 +161,11 @@ class Logger:
         file: Optional[Path] = None,
         file_rotation: str = "3 days",
         file_retention: str = "1 week",
+        serialize: bool = False,
+        queue_size: int = 10000,
+        access_sample_rate: float = 1.0,
         interceptions: Sequence[str] = [
             "uvicorn",
-            "uvicorn.access",
             "uvicorn.error",
             "uvicorn.asgi",
             "fastapi",
@@ -58,10 +173,19 @@ class Logger:
     ) -> LoggerInstance:
         logger.remove()
 
+        if mode in ["file", "all"] and serialize:
+            # before the console handlers are added, see `LogFile`
+            file_sink = QueueSink.of(
+                LogFile.of(str(file), file_rotation, file_retention), queue_size
+            )
+
         if mode in ["console", "all"]:
+            # JSON records are written by a bounded background writer
+            # instead of the unbounded loguru queue
             logger.add(
-                sys.stdout,
-                enqueue=True,
+                QueueSink.of(sys.stdout, queue_size) if serialize else sys.stdout,
+                enqueue=not serialize,
+                serialize=serialize,
                 backtrace=True,
                 level=level.upper(),
                 format=console_format,
@@ -69,8 +193,9 @@ class Logger:
                 in ["INFO", "WARNING", "DEBUG", "TRACE"],
             )
             logger.add(
-                sys.stderr,
-                enqueue=True,
+                QueueSink.of(sys.stderr, queue_size) if serialize else sys.stderr,
+                enqueue=not serialize,
+                serialize=serialize,
                 backtrace=True,
                 level=level.upper(),
                 format=console_format,
@@ -78,15 +203,24 @@ class Logger:
             )
 
         if mode in ["file", "all"]:
-            logger.add(
-                str(file),
-                rotation=file_rotation,
-                retention=file_retention,
-                enqueue=True,
-                backtrace=True,
-                level=level.upper(),
-                format=file_format,
-            )
+            if serialize:
+                logger.add(
+                    file_sink,
+                    serialize=True,
+                    backtrace=True,
+                    level=level.upper(),
+                    format=file_format,
+                )
+            else:
+                logger.add(
+                    str(file),
+                    rotation=file_rotation,
+                    retention=file_retention,
+                    enqueue=True,
+                    backtrace=True,
+                    level=level.upper(),
+                    format=file_format,
+                )
 
         logging.basicConfig(
             handlers=[InterceptHandler()], level=logging.NOTSET, force=True
@@ -95,6 +229,10 @@ class Logger:
         for external_logger in interceptions:
             logging.getLogger(external_logger).handlers = [InterceptHandler()]
 
+        logging.getLogger("uvicorn.access").handlers = [
+            AccessInterceptHandler(access_sample_rate)
+        ]
+
         Logger.__instance__ = logger
 
         return logger  # type: ignore
@@ -104,13 +242,16 @@ class Logger:
         return Logger.__instance__
 
     @staticmethod
-    def uvicorn_config(level: LogLevel) -> dict:
+    def uvicorn_config(level: LogLevel, access_sample_rate: float = 1.0) -> dict:
         return {
             "version": 1,
             "disable_existing_loggers": False,
             "handlers": {
                 "default": {"class": "materia.core.logging.InterceptHandler"},
-                "access": {"class": "materia.core.logging.InterceptHandler"},
+                "access": {
+                    "class": "materia.core.logging.AccessInterceptHandler",
+                    "sample_rate": access_sample_rate,
+                },
             },
             "loggers": {
                 "uvicorn": {
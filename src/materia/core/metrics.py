@@ -0,0 +1,122 @@
+from functools import wraps
+from os import environ
+from time import perf_counter
+from typing import Awaitable, Callable, ParamSpec, TypeVar
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+T = TypeVar("T")
+P = ParamSpec("P")
+
+http_request_duration = Histogram(
+    "materia_http_request_duration_seconds",
+    "HTTP request latency.",
+    ["method", "route", "status"],
+)
+http_request_bytes = Counter(
+    "materia_http_request_bytes_total",
+    "Bytes received in HTTP request bodies.",
+    ["route"],
+)
+http_response_bytes = Counter(
+    "materia_http_response_bytes_total",
+    "Bytes sent in HTTP response bodies.",
+    ["route"],
+)
+upload_bytes = Counter(
+    "materia_upload_bytes_total",
+    "Bytes of uploaded file contents.",
+)
+database_query_duration = Histogram(
+    "materia_database_query_duration_seconds",
+    "Database statement execution time.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+http_request_queries = Histogram(
+    "materia_http_request_queries",
+    "Number of database statements executed per HTTP request.",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+database_pool_connections = Gauge(
+    "materia_database_pool_connections",
+    "Database pool connections by state.",
+    ["engine", "state"],
+)
+database_pool_wait = Gauge(
+    "materia_database_pool_wait_seconds",
+    "Total time spent waiting for a database pool connection.",
+    ["engine"],
+)
+cache_command_duration = Histogram(
+    "materia_cache_command_duration_seconds",
+    "Cache command latency.",
+    ["command"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+cron_queue_depth = Gauge(
+    "materia_cron_queue_depth",
+    "Number of tasks waiting in a cron queue.",
+    ["queue"],
+)
+cron_task_duration = Histogram(
+    "materia_cron_task_duration_seconds",
+    "Cron task runtime.",
+    ["task", "state"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+filesystem_operation_duration = Histogram(
+    "materia_filesystem_operation_duration_seconds",
+    "Filesystem operation time.",
+    ["operation"],
+)
+
+
+def timed(
+    operation: str,
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+    """Observe the duration of a filesystem coroutine."""
+
+    def decorator(func: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+        histogram = filesystem_operation_duration.labels(operation)
+
+        @wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            start = perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def update_database_pool(name: str, status: dict):
+    for state in ("size", "checked_in", "checked_out", "overflow"):
+        if state in status:
+            database_pool_connections.labels(name, state).set(status[state])
+
+    if "wait_time" in status:
+        database_pool_wait.labels(name).set(status["wait_time"])
+
+
+def generate() -> tuple[bytes, str]:
+    """Render metrics of the current process or, when
+    `PROMETHEUS_MULTIPROC_DIR` is set, of all server and cron processes.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,197 @@
+from collections import Counter
+from pathlib import Path
+from threading import Event, Thread, get_ident
+from time import monotonic
+from types import FrameType
+from typing import Literal, Optional, TypeAlias
+import asyncio
+import cProfile
+import marshal
+import sys
+from materia.core.logging import Logger
+
+ProfileFormat: TypeAlias = Literal["folded", "pstats"]
+
+
+class ProfilingError(Exception):
+    pass
+
+
+def frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return "{} ({}:{})".format(
+        code.co_qualname, Path(code.co_filename).name, code.co_firstlineno
+    )
+
+
+def frame_stack(frame: Optional[FrameType]) -> list[str]:
+    """Frame names from the outermost to the given frame."""
+    stack = []
+    while frame is not None:
+        stack.append(frame_name(frame))
+        frame = frame.f_back
+
+    return list(reversed(stack))
+
+
+class StackSampler:
+    """Sample the call stack of a thread from a background thread.
+    The result is in the collapsed stack format consumed by flamegraph.pl
+    and speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stopped = Event()
+        self._thread = Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            if frame := sys._current_frames().get(self.thread_id):
+                self.samples[";".join(frame_stack(frame))] += 1
+
+    def folded(self) -> bytes:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.samples.most_common()
+        ).encode()
+
+
+class Profiler:
+    """Profile the event loop thread of the current worker.
+    Only one profile may run at a time.
+    """
+
+    _running: bool = False
+
+    @staticmethod
+    async def profile(
+        duration: float, format: ProfileFormat = "folded", interval: float = 0.005
+    ) -> bytes:
+        if Profiler._running:
+            raise ProfilingError("Profiler is already running")
+
+        Profiler._running = True
+        try:
+            if format == "pstats":
+                profile = cProfile.Profile()
+                profile.enable()
+                try:
+                    await asyncio.sleep(duration)
+                finally:
+                    profile.disable()
+
+                profile.create_stats()
+
+                return marshal.dumps(profile.stats)
+
+            sampler = StackSampler(get_ident(), interval)
+            sampler.start()
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                sampler.stop()
+
+            return sampler.folded()
+        finally:
+            Profiler._running = False
+
+    @staticmethod
+    def tasks() -> list[dict]:
+        """Dump the asyncio tasks of the current event loop."""
+        return [
+            {
+                "name": task.get_name(),
+                "coroutine": getattr(
+                    task.get_coro(), "__qualname__", repr(task.get_coro())
+                ),
+                "done": task.done(),
+                "stack": [frame_name(frame) for frame in task.get_stack()],
+            }
+            for task in asyncio.all_tasks()
+        ]
+
+    @staticmethod
+    async def loop_lag(duration: float, interval: float = 0.01) -> dict:
+        """Measure how late the event loop wakes up a sleeping coroutine."""
+        lags = []
+        deadline = monotonic() + duration
+
+        while monotonic() < deadline:
+            start = monotonic()
+            await asyncio.sleep(interval)
+            lags.append(max(monotonic() - start - interval, 0.0))
+
+        lags.sort()
+
+        return {
+            "samples": len(lags),
+            "mean": sum(lags) / len(lags) if lags else 0.0,
+            "p99": lags[int(len(lags) * 0.99) - 1] if lags else 0.0,
+            "max": lags[-1] if lags else 0.0,
+        }
+
+
+class BlockingDetector:
+    """Detect callbacks that block the event loop.
+
+    A coroutine on the loop updates a heartbeat; a watchdog thread captures
+    the stack of the loop thread once the heartbeat is older than the
+    threshold, which points at the code holding the loop.
+    """
+
+    def __init__(self, threshold: float = 0.1):
+        self.threshold = threshold
+        self.interval = threshold / 2
+        self.beat = monotonic()
+        self.thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = Event()
+        self._watchdog = Thread(target=self.watch, daemon=True)
+
+    def start(self):
+        self.thread_id = get_ident()
+        self.beat = monotonic()
+        self._task = asyncio.get_running_loop().create_task(self.heartbeat())
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+        await asyncio.to_thread(self._watchdog.join)
+
+    async def heartbeat(self):
+        while True:
+            start = monotonic()
+            self.beat = start
+            await asyncio.sleep(self.interval)
+
+            if (lag := monotonic() - start - self.interval) >= self.threshold:
+                if logger := Logger.instance():
+                    logger.warning("Event loop was blocked for {:.1f} ms", lag * 1000)
+
+    def watch(self):
+        reported = None
+
+        while not self._stopped.wait(self.interval):
+            beat = self.beat
+            if beat == reported or monotonic() - beat < self.threshold:
+                continue
+
+            reported = beat
+            if frame := sys._current_frames().get(self.thread_id):
+                if logger := Logger.instance():
+                    logger.warning(
+                        "Event loop is blocked for more than {:.1f} ms at:\n{}",
+                        self.threshold * 1000,
+                        "\n".join(f"  {name}" for name in frame_stack(frame)),
+                    )
@@ -5,7 +5,7 @@ from materia.models.auth import (
     #    OAuth2Grant,
     #    OAuth2AuthorizationCode,
 )
-from materia.models.user import User, UserCredentials, UserInfo
+from materia.models.user import User, UserCredentials, UserInfo, UserError
 from materia.models.repository import (
     Repository,
     RepositoryInfo,
@@ -24,8 +24,10 @@ from materia.models.directory import (
 from materia.models.file import (
     File,
     FileLink,
+    FilePreview,
     FileInfo,
     FilePath,
     FileRename,
     FileCopyMove,
 )
+from materia.models import events
@@ -1,9 +1,7 @@
 from time import time
-from typing import List, Optional, Self, Union
+from typing import TYPE_CHECKING, List, Optional, Self, Union
 from uuid import UUID, uuid4
 
-import bcrypt
-import httpx
 from sqlalchemy import BigInteger, ForeignKey, JSON, and_, select
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 from pydantic import BaseModel, HttpUrl
@@ -12,6 +10,9 @@ from materia.models.base import Base
 from materia.core import Database, Cache
 from materia import security
 
+if TYPE_CHECKING:
+    import httpx
+
 
 class OAuth2Application(Base):
     __tablename__ = "oauth2_application"
@@ -41,6 +42,8 @@ class OAuth2Application(Base):
         return False
 
     async def generate_client_secret(self, db: Database) -> str:
+        import bcrypt
+
         client_secret = security.generate_key()
         hashed_secret = bcrypt.hashpw(client_secret, bcrypt.gensalt())
 
@@ -53,6 +56,8 @@ class OAuth2Application(Base):
         return str(client_secret)
 
     def validate_client_secret(self, secret: bytes) -> bool:
+        import bcrypt
+
         return bcrypt.checkpw(secret, self.hashed_client_secret.encode())
 
     @staticmethod
@@ -113,7 +118,9 @@ class OAuth2AuthorizationCode(BaseModel):
     created: int
     lifetime: int
 
-    def generate_redirect_uri(self, state: Optional[str] = None) -> httpx.URL:
+    def generate_redirect_uri(self, state: Optional[str] = None) -> "httpx.URL":
+        import httpx
+
         redirect = httpx.URL(str(self.redirect_uri))
 
         if state:
@@ -8,7 +8,7 @@ import sqlalchemy as sa
 from pydantic import BaseModel, ConfigDict
 
 from materia.models.base import Base
-from materia.core import SessionContext, Config, FileSystem
+from materia.core import SessionContext, Config, FileSystem, ProgressCallback
 
 
 class DirectoryError(Exception):
@@ -29,6 +29,8 @@ class Directory(Base):
     updated: Mapped[int] = mapped_column(BigInteger, nullable=False, default=time)
     name: Mapped[str]
     is_public: Mapped[bool] = mapped_column(default=False)
+    # increased on every change of the directory or its subtree
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
 
     repository: Mapped["Repository"] = relationship(back_populates="directories")
     directories: Mapped[List["Directory"]] = relationship(back_populates="parent")
@@ -51,7 +53,12 @@ class Directory(Base):
 
         return self
 
-    async def remove(self, session: SessionContext, config: Config):
+    async def remove(
+        self,
+        session: SessionContext,
+        config: Config,
+        progress: Optional[ProgressCallback] = None,
+    ):
         session.add(self)
         await session.refresh(
             self, attribute_names=["repository", "directories", "files"]
@@ -59,11 +66,11 @@ class Directory(Base):
 
         if self.directories:
             for directory in self.directories:
-                await directory.remove(session, config)
+                await directory.remove(session, config, progress=progress)
 
         if self.files:
             for file in self.files:
-                await file.remove(session, config)
+                await file.remove(session, config, progress=progress)
 
         repository_path = await self.repository.real_path(session, config)
         directory_path = await self.real_path(session, config)
@@ -74,6 +81,9 @@ class Directory(Base):
         await session.delete(self)
         await session.flush()
 
+        if progress:
+            progress(1, 0)
+
     async def relative_path(self, session: SessionContext) -> Optional[Path]:
         """Get path of the directory relative repository root."""
         if inspect(self).was_deleted:
@@ -160,6 +170,7 @@ class Directory(Base):
         config: Config,
         force: bool = False,
         shallow: bool = False,
+        progress: Optional[ProgressCallback] = None,
     ) -> Self:
         session.add(self)
         await session.refresh(self, attribute_names=["repository"])
@@ -172,7 +183,7 @@ class Directory(Base):
 
         current_directory = FileSystem(directory_path, repository_path)
         new_directory = await current_directory.copy(
-            target_path, force=force, shallow=shallow
+            target_path, force=force, shallow=shallow, progress=progress
         )
 
         cloned = self.clone()
@@ -181,11 +192,16 @@ class Directory(Base):
         session.add(cloned)
         await session.flush()
 
+        if progress:
+            progress(1, 0)
+
         await session.refresh(self, attribute_names=["files", "directories"])
         for directory in self.directories:
-            await directory.copy(cloned, session, config, shallow=True)
+            await directory.copy(
+                cloned, session, config, shallow=True, progress=progress
+            )
         for file in self.files:
-            await file.copy(cloned, session, config, shallow=True)
+            await file.copy(cloned, session, config, shallow=True, progress=progress)
 
         return self
 
@@ -196,6 +212,7 @@ class Directory(Base):
         config: Config,
         force: bool = False,
         shallow: bool = False,
+        progress: Optional[ProgressCallback] = None,
     ) -> Self:
         session.add(self)
         await session.refresh(self, attribute_names=["repository"])
@@ -217,6 +234,9 @@ class Directory(Base):
 
         await session.flush()
 
+        if progress:
+            progress(1, 0)
+
         return self
 
     async def rename(
@@ -242,6 +262,36 @@ class Directory(Base):
         await session.flush()
         return self
 
+    @staticmethod
+    async def rows(
+        repository_id: int, session: SessionContext, *where
+    ) -> list[dict]:
+        """DirectoryInfo fields of the matching directories of the repository
+        straight from the database, with `used` summed in the same query.
+        `path` is left to the caller.
+        """
+        used = (
+            sa.select(File.parent_id, sa.func.sum(File.size).label("used"))
+            .where(File.repository_id == repository_id)
+            .group_by(File.parent_id)
+            .subquery()
+        )
+        columns = [
+            getattr(Directory, name)
+            for name in DirectoryInfo.model_fields
+            if name not in ("path", "used")
+        ]
+        result = await session.execute(
+            sa.select(
+                *columns,
+                sa.cast(sa.func.coalesce(used.c.used, 0), BigInteger).label("used"),
+            )
+            .outerjoin(used, used.c.parent_id == Directory.id)
+            .where(Directory.repository_id == repository_id, *where)
+        )
+
+        return [dict(row) for row in result.mappings()]
+
     async def info(self, session: SessionContext) -> "DirectoryInfo":
         session.add(self)
         await session.refresh(self, attribute_names=["files"])
@@ -0,0 +1,96 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, aliased
+import sqlalchemy as sa
+
+from materia.models.repository import Repository
+from materia.models.directory import Directory
+from materia.models.file import File
+
+
+def changed_ids(session: Session) -> tuple[set, set]:
+    """Directories and repositories changed in the current transaction."""
+    return (
+        session.info.setdefault("changed_directories", set()),
+        session.info.setdefault("changed_repositories", set()),
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def collect_changes(session: Session, flush_context):
+    """Remember the parent directories of every flushed file and directory
+    and their repositories. Versions are increased once on commit, so long
+    transactions that flush many times do not hold the rows locked.
+    """
+    directory_ids, repository_ids = changed_ids(session)
+
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(instance, (Directory, File)):
+            continue
+        if instance in session.dirty and not session.is_modified(instance):
+            continue
+
+        state = inspect(instance)
+        # history still holds the previous parent of a moved entry
+        directory_ids.update(state.attrs.parent_id.history.sum())
+        repository_ids.update(state.attrs.repository_id.history.sum())
+
+        if isinstance(instance, Directory) and instance in session.dirty:
+            directory_ids.add(instance.id)
+
+    directory_ids.discard(None)
+    repository_ids.discard(None)
+
+
+@event.listens_for(Session, "before_commit")
+def increase_versions(session: Session):
+    """Increase versions of the changed directories up to the root and of
+    their repositories, so that a version changes with any change in the
+    subtree. Rows are locked in a fixed order, directories by id and then
+    repositories by id, so that concurrent commits cannot deadlock.
+    """
+    # the commit flushes after this hook
+    session.flush()
+
+    directory_ids, repository_ids = changed_ids(session)
+    session.info.pop("changed_directories")
+    session.info.pop("changed_repositories")
+
+    if directory_ids:
+        ancestors = (
+            sa.select(Directory.id, Directory.parent_id)
+            .where(Directory.id.in_(directory_ids))
+            .cte("ancestors", recursive=True)
+        )
+        parent = aliased(Directory)
+        ancestors = ancestors.union(
+            sa.select(parent.id, parent.parent_id).join(
+                ancestors, parent.id == ancestors.c.parent_id
+            )
+        )
+        # removed directories are not found
+        ids = sorted(set(session.scalars(sa.select(ancestors.c.id)).all()))
+        update_versions(session, Directory, ids)
+
+    update_versions(session, Repository, sorted(repository_ids))
+
+
+def update_versions(session: Session, model, ids: list):
+    if not ids:
+        return
+
+    table = model.__table__
+    session.execute(
+        sa.select(table.c.id)
+        .where(table.c.id.in_(ids))
+        .order_by(table.c.id)
+        .with_for_update()
+    )
+    session.execute(
+        sa.update(table).where(table.c.id.in_(ids)).values(version=table.c.version + 1)
+    )
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_changes(session: Session):
+    session.info.pop("changed_directories", None)
+    session.info.pop("changed_repositories", None)
@@ -1,6 +1,7 @@
 from time import time
 from typing import Optional, Self, Union
 from pathlib import Path
+import shutil
 
 from sqlalchemy import BigInteger, ForeignKey, inspect
 from sqlalchemy.orm import mapped_column, Mapped, relationship
@@ -8,7 +9,13 @@ import sqlalchemy as sa
 from pydantic import BaseModel, ConfigDict
 
 from materia.models.base import Base
-from materia.core import SessionContext, Config, FileSystem
+from materia.core import (
+    SessionContext,
+    Config,
+    FileSystem,
+    ProgressCallback,
+    content_hash,
+)
 
 
 class FileError(Exception):
@@ -30,6 +37,8 @@ class File(Base):
     name: Mapped[str]
     is_public: Mapped[bool] = mapped_column(default=False)
     size: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    # algorithm prefixed digest, e.g. sha256:<hex>
+    content_hash: Mapped[Optional[str]] = mapped_column(nullable=True)
 
     repository: Mapped["Repository"] = relationship(back_populates="files")
     parent: Mapped["Directory"] = relationship(back_populates="files")
@@ -48,6 +57,7 @@ class File(Base):
 
         if isinstance(data, bytes):
             await new_file.write_file(data)
+            self.content_hash = content_hash(data)
         elif isinstance(data, Path):
             from_file = FileSystem(data, config.application.working_directory)
             await from_file.move(file_path.parent, new_name=file_path.name)
@@ -59,7 +69,12 @@ class File(Base):
 
         return self
 
-    async def remove(self, session: SessionContext, config: Config):
+    async def remove(
+        self,
+        session: SessionContext,
+        config: Config,
+        progress: Optional[ProgressCallback] = None,
+    ):
         session.add(self)
 
         file_path = await self.real_path(session, config)
@@ -69,9 +84,17 @@ class File(Base):
         )
         await new_file.remove()
 
+        previews = FileSystem(
+            FilePreview.directory(self.id, config), config.application.working_directory
+        )
+        await previews.remove()
+
         await session.delete(self)
         await session.flush()
 
+        if progress:
+            progress(1, self.size or 0)
+
     async def relative_path(self, session: SessionContext) -> Optional[Path]:
         if inspect(self).was_deleted:
             return None
@@ -144,6 +167,7 @@ class File(Base):
         config: Config,
         force: bool = False,
         shallow: bool = False,
+        progress: Optional[ProgressCallback] = None,
     ) -> Self:
         session.add(self)
         await session.refresh(self, attribute_names=["repository"])
@@ -155,7 +179,9 @@ class File(Base):
         )
 
         current_file = FileSystem(file_path, repository_path)
-        new_file = await current_file.copy(directory_path, force=force, shallow=shallow)
+        new_file = await current_file.copy(
+            directory_path, force=force, shallow=shallow, progress=progress
+        )
 
         cloned = self.clone()
         cloned.name = new_file.name()
@@ -163,6 +189,9 @@ class File(Base):
         session.add(cloned)
         await session.flush()
 
+        if progress:
+            progress(1, 0)
+
         return self
 
     async def move(
@@ -216,6 +245,18 @@ class File(Base):
         await session.flush()
         return self
 
+    @staticmethod
+    async def rows(session: SessionContext, *where) -> list[dict]:
+        """FileInfo fields of the matching files straight from the database,
+        without ORM objects and validation. `path` is left to the caller.
+        """
+        columns = [
+            getattr(File, name) for name in FileInfo.model_fields if name != "path"
+        ]
+        result = await session.execute(sa.select(*columns).where(*where))
+
+        return [dict(row) for row in result.mappings()]
+
     async def info(self, session: SessionContext) -> Optional["FileInfo"]:
         info = FileInfo.model_validate(self)
         relative_path = await self.relative_path(session)
@@ -242,6 +283,49 @@ class FileLink(Base):
     file: Mapped["File"] = relationship(back_populates="link")
 
 
+class FilePreview(Base):
+    __tablename__ = "file_preview"
+    __table_args__ = (sa.UniqueConstraint("file_id", "size"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    file_id: Mapped[int] = mapped_column(
+        ForeignKey("file.id", ondelete="CASCADE"), index=True
+    )
+    size: Mapped[int]
+    created: Mapped[int] = mapped_column(BigInteger, default=time)
+
+    file: Mapped["File"] = relationship()
+
+    @staticmethod
+    def directory(file_id: int, config: Config) -> Path:
+        return config.application.working_directory.joinpath(
+            "previews", str(file_id)
+        )
+
+    def path(self, config: Config) -> Path:
+        return FilePreview.directory(self.file_id, config).joinpath(
+            f"{self.size}.webp"
+        )
+
+    @staticmethod
+    def remove_directories(file_ids: list[int], config: Config):
+        """Remove previews of the files, e.g. of a removed repository."""
+        for file_id in file_ids:
+            shutil.rmtree(FilePreview.directory(file_id, config), ignore_errors=True)
+
+    @staticmethod
+    async def by_file(
+        file: File, size: int, session: SessionContext
+    ) -> Optional["FilePreview"]:
+        return (
+            await session.scalars(
+                sa.select(FilePreview).where(
+                    FilePreview.file_id == file.id, FilePreview.size == size
+                )
+            )
+        ).first()
+
+
 class FileInfo(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -253,6 +337,7 @@ class FileInfo(BaseModel):
     name: str
     is_public: bool
     size: int
+    content_hash: Optional[str] = None
 
     path: Optional[Path] = None
 
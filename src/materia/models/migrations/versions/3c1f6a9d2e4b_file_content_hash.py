@@ -0,0 +1,26 @@
+"""file content hash
+
+Revision ID: 3c1f6a9d2e4b
+Revises: bf2ef6c7ab70
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f6a9d2e4b'
+down_revision: Union[str, None] = 'bf2ef6c7ab70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('file', sa.Column('content_hash', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('file', 'content_hash')
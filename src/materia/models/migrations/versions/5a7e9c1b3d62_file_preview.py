@@ -0,0 +1,36 @@
+"""file preview
+
+Revision ID: 5a7e9c1b3d62
+Revises: 8e5d2b7c4a91
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7e9c1b3d62'
+down_revision: Union[str, None] = '8e5d2b7c4a91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('file_preview',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('file_id', sa.BigInteger(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('created', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['file_id'], ['file.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('file_id', 'size')
+    )
+    op.create_index(op.f('ix_file_preview_file_id'), 'file_preview', ['file_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_file_preview_file_id'), table_name='file_preview')
+    op.drop_table('file_preview')
@@ -0,0 +1,28 @@
+"""directory and repository version
+
+Revision ID: 8e5d2b7c4a91
+Revises: 3c1f6a9d2e4b
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e5d2b7c4a91'
+down_revision: Union[str, None] = '3c1f6a9d2e4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('directory', sa.Column('version', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('repository', sa.Column('version', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('repository', 'version')
+    op.drop_column('directory', 'version')
@@ -9,7 +9,7 @@ import sqlalchemy as sa
 from pydantic import BaseModel, ConfigDict
 
 from materia.models.base import Base
-from materia.core import SessionContext, Config
+from materia.core import SessionContext, Config, FileSystem
 
 
 class RepositoryError(Exception):
@@ -22,6 +22,8 @@ class Repository(Base):
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     user_id: Mapped[UUID] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"))
     capacity: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # increased on every change of the repository content
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
 
     user: Mapped["User"] = relationship(back_populates="repository")
     directories: Mapped[List["Directory"]] = relationship(back_populates="repository")
@@ -37,7 +39,7 @@ class Repository(Base):
         )
 
         try:
-            repository_path.mkdir(parents=True, exist_ok=True)
+            await FileSystem.run(repository_path.mkdir, parents=True, exist_ok=True)
         except OSError as e:
             raise RepositoryError(
                 f"Failed to create repository at /{relative_path}:",
@@ -61,26 +63,26 @@ class Repository(Base):
 
     async def remove(self, session: SessionContext, config: Config):
         session.add(self)
-        await session.refresh(self, attribute_names=["directories", "files"])
-
-        for directory in self.directories:
-            if directory.is_root():
-                await directory.remove(session)
-
-        for file in self.files:
-            await file.remove(session)
+        file_ids = (
+            await session.scalars(
+                sa.select(File.id).where(File.repository_id == self.id)
+            )
+        ).all()
 
         repository_path = await self.real_path(session, config)
 
         try:
-            shutil.rmtree(str(repository_path))
+            await FileSystem.run(shutil.rmtree, str(repository_path))
         except OSError as e:
             raise RepositoryError(
                 f"Failed to remove repository at /{repository_path.relative_to(config.application.working_directory)}:",
                 *e.args,
             )
 
-        await session.delete(self)
+        await FileSystem.run(FilePreview.remove_directories, file_ids, config)
+
+        # directories and files are removed by the database
+        await session.execute(sa.delete(Repository).where(Repository.id == self.id))
         await session.flush()
 
     async def update(self, session: SessionContext):
@@ -128,4 +130,4 @@ class RepositoryContent(BaseModel):
 
 from materia.models.user import User
 from materia.models.directory import Directory, DirectoryInfo
-from materia.models.file import File, FileInfo
+from materia.models.file import File, FileInfo, FilePreview
@@ -1,5 +1,7 @@
 from uuid import UUID, uuid4
 from typing import Optional, Self, BinaryIO
+from pathlib import Path
+import os
 import time
 import re
 
@@ -7,9 +9,7 @@ from pydantic import BaseModel, EmailStr, ConfigDict
 from sqlalchemy import BigInteger
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 import sqlalchemy as sa
-from PIL import Image
 from sqids.sqids import Sqids
-from aiofiles import os as async_os
 
 from materia import security
 from materia.models.base import Base
@@ -19,6 +19,15 @@ from materia.core import SessionContext, Config, FileSystem
 valid_username = re.compile(r"^[\da-zA-Z][-.\w]*$")
 invalid_username = re.compile(r"[-._]{2,}|[-._]$")
 
+# avatar variants that may be requested and cached, format -> media type
+avatar_formats = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+}
+avatar_sizes = (32, 64, 128, 256, 512)
+
 
 class UserError(Exception):
     pass
@@ -56,14 +65,14 @@ class User(Base):
         await session.flush()
         return self
 
-    async def remove(self, session: SessionContext):
+    async def remove(self, session: SessionContext, config: Config):
         session.add(self)
         await session.refresh(self, attribute_names=["repository"])
 
         if self.repository:
-            await self.repository.remove()
+            await self.repository.remove(session, config)
 
-        await session.delete(self)
+        await session.execute(sa.delete(User).where(User.id == self.id))
         await session.flush()
 
     def update_last_login(self):
@@ -155,6 +164,7 @@ class User(Base):
             )
             if await avatar_file.exists():
                 await avatar_file.remove()
+            await User.remove_avatar_variants(self.avatar, config)
 
             session.add(self)
             self.avatar = None
@@ -162,6 +172,8 @@ class User(Base):
 
             return
 
+        from PIL import Image
+
         try:
             image = Image.open(avatar)
         except Exception as e:
@@ -175,9 +187,10 @@ class User(Base):
         )
 
         try:
-            if not avatar_dir.exists():
-                await async_os.mkdir(avatar_dir)
-            image.save(avatar_dir.joinpath(avatar_id), format=image.format)
+            await FileSystem.run(avatar_dir.mkdir, exist_ok=True)
+            await FileSystem.run(
+                image.save, avatar_dir.joinpath(avatar_id), format=image.format
+            )
         except Exception as e:
             raise UserError(f"Failed to save avatar: {e}") from e
 
@@ -187,11 +200,65 @@ class User(Base):
             )
             if await avatar_file.exists():
                 await avatar_file.remove()
+            await User.remove_avatar_variants(old_avatar, config)
 
         session.add(self)
         self.avatar = avatar_id
         await session.flush()
 
+    @staticmethod
+    async def avatar_variant(
+        avatar_id: str, format: str, size: Optional[int], config: Config
+    ) -> Optional[Path]:
+        """Path of the avatar converted to the format and fitted into the size.
+        Variants are rendered once and kept on disk until the avatar changes.
+        """
+        avatar_dir = config.application.working_directory.joinpath("avatars")
+        source = avatar_dir.joinpath(avatar_id)
+        variant = avatar_dir.joinpath(
+            "variants", avatar_id, "{}.{}".format(size or "original", format.lower())
+        )
+
+        if await FileSystem.run(variant.is_file):
+            return variant
+        if not await FileSystem.run(source.is_file):
+            return None
+
+        try:
+            await FileSystem.run(render_avatar, source, variant, format, size)
+        except OSError as e:
+            raise UserError("Failed to process avatar") from e
+
+        return variant
+
+    @staticmethod
+    async def remove_avatar_variants(avatar_id: str, config: Config):
+        variants = FileSystem(
+            config.application.working_directory.joinpath(
+                "avatars", "variants", avatar_id
+            ),
+            config.application.working_directory,
+        )
+        await variants.remove()
+
+
+def render_avatar(source: Path, target: Path, format: str, size: Optional[int]):
+    from PIL import Image
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # concurrent requests may render the same variant, the last rename wins
+    temporary = target.with_name(f".{uuid4()}{target.suffix}")
+
+    with Image.open(source) as image:
+        if format == "JPEG":
+            image = image.convert("RGB")
+        if size:
+            image.thumbnail((size, size))
+
+        image.save(temporary, format=format)
+
+    os.replace(temporary, target)
+
 
 class UserCredentials(BaseModel):
     name: str
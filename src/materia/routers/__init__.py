@@ -1 +1 @@
-from materia.routers import middleware, api, resources, root, docs
+from materia.routers import middleware, api, resources, root, docs, metrics
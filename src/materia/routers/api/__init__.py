@@ -1,6 +1,14 @@
 from fastapi import APIRouter, HTTPException
 from materia.routers.api.auth import auth, oauth
-from materia.routers.api import docs, user, repository, directory, file
+from materia.routers.api import (
+    docs,
+    user,
+    repository,
+    directory,
+    file,
+    tasks,
+    admin,
+)
 
 router = APIRouter(prefix="/api")
 router.include_router(docs.router)
@@ -10,6 +18,8 @@ router.include_router(user.router)
 router.include_router(repository.router)
 router.include_router(directory.router)
 router.include_router(file.router)
+router.include_router(tasks.router)
+router.include_router(admin.router)
 
 
 @router.get("/api/{catchall:path}", status_code=404, include_in_schema=False)
@@ -0,0 +1,66 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from materia.models import User
+from materia.core import Profiler, ProfilingError, ProfileFormat
+from materia.routers import middleware
+
+router = APIRouter(tags=["admin"], prefix="/admin")
+
+
+def check_profiling(ctx: middleware.Context = Depends()):
+    if not ctx.config.profiling.enabled:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Profiling is disabled")
+
+
+@router.get("/metrics")
+async def metrics(
+    user: User = Depends(middleware.admin), ctx: middleware.Context = Depends()
+):
+    return {"database": ctx.database.pool_status()}
+
+
+@router.get("/profile", dependencies=[Depends(check_profiling)])
+async def profile(
+    seconds: float = Query(10, gt=0),
+    format: ProfileFormat = "folded",
+    user: User = Depends(middleware.admin),
+    ctx: middleware.Context = Depends(),
+):
+    """Profile the worker serving this request.
+    `folded` returns sampled stacks for flame graphs, `pstats` returns
+    a file for the `pstats` module.
+    """
+    seconds = min(seconds, ctx.config.profiling.max_duration)
+
+    try:
+        content = await Profiler.profile(
+            seconds, format, interval=ctx.config.profiling.sample_interval
+        )
+    except ProfilingError as e:
+        raise HTTPException(status.HTTP_409_CONFLICT, f"{e}")
+
+    filename = "materia-{}.{}".format(
+        os.getpid(), "folded" if format == "folded" else "pstats"
+    )
+
+    return Response(
+        content,
+        media_type="text/plain" if format == "folded" else "application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/tasks", dependencies=[Depends(check_profiling)])
+async def tasks(user: User = Depends(middleware.admin)):
+    return {"pid": os.getpid(), "tasks": Profiler.tasks()}
+
+
+@router.get("/loop-lag", dependencies=[Depends(check_profiling)])
+async def loop_lag(
+    seconds: float = Query(5, gt=0),
+    user: User = Depends(middleware.admin),
+    ctx: middleware.Context = Depends(),
+):
+    seconds = min(seconds, ctx.config.profiling.max_duration)
+
+    return {"pid": os.getpid(), **(await Profiler.loop_lag(seconds))}
@@ -1,5 +1,5 @@
 from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from materia.models import (
     User,
     Directory,
@@ -9,9 +9,12 @@ from materia.models import (
     DirectoryRename,
     DirectoryCopyMove,
     Repository,
+    File,
 )
 from materia.core import SessionContext, Config, FileSystem
 from materia.routers import middleware
+from materia.routers.api.tasks import queue_task
+from materia.tasks import copy_directory, move_directory, remove_directory
 
 router = APIRouter(tags=["directory"])
 
@@ -95,14 +98,22 @@ async def create(
 @router.get("/directory")
 async def info(
     path: Path,
+    request: Request,
+    response: Response,
     repository: Repository = Depends(middleware.repository),
     ctx: middleware.Context = Depends(),
 ):
-    async with ctx.database.session() as session:
+    async with ctx.database.session(readonly=True) as session:
         directory = await validate_current_directory(
             path, repository, session, ctx.config
         )
 
+        tag = middleware.etag(
+            "directory", directory.id, directory.version, FileSystem.normalize(path)
+        )
+        if not_modified := middleware.conditional(request, response, tag):
+            return not_modified
+
         info = await directory.info(session)
 
         return info
@@ -111,6 +122,7 @@ async def info(
 @router.delete("/directory")
 async def remove(
     path: Path,
+    background: bool = Query(False, alias="async"),
     repository: Repository = Depends(middleware.repository),
     ctx: middleware.Context = Depends(),
 ):
@@ -119,6 +131,12 @@ async def remove(
             path, repository, session, ctx.config
         )
 
+        if background:
+            task_id = await queue_task(
+                remove_directory, repository.user_id, ctx.cache, repository.id, path
+            )
+            return {"task_id": task_id}
+
         await directory.remove(session, ctx.config)
         await session.commit()
 
@@ -141,6 +159,7 @@ async def rename(
 @router.patch("/directory/move")
 async def move(
     data: DirectoryCopyMove,
+    background: bool = Query(False, alias="async"),
     repository: Repository = Depends(middleware.repository),
     ctx: middleware.Context = Depends(),
 ):
@@ -152,6 +171,18 @@ async def move(
             data.target, repository, session, ctx.config
         )
 
+        if background:
+            task_id = await queue_task(
+                move_directory,
+                repository.user_id,
+                ctx.cache,
+                repository.id,
+                data.path,
+                data.target,
+                data.force,
+            )
+            return {"task_id": task_id}
+
         await directory.move(target_directory, session, ctx.config, force=data.force)
         await session.commit()
 
@@ -159,6 +190,7 @@ async def move(
 @router.post("/directory/copy")
 async def copy(
     data: DirectoryCopyMove,
+    background: bool = Query(False, alias="async"),
     repository: Repository = Depends(middleware.repository),
     ctx: middleware.Context = Depends(),
 ):
@@ -170,6 +202,18 @@ async def copy(
             data.target, repository, session, ctx.config
         )
 
+        if background:
+            task_id = await queue_task(
+                copy_directory,
+                repository.user_id,
+                ctx.cache,
+                repository.id,
+                data.path,
+                data.target,
+                data.force,
+            )
+            return {"task_id": task_id}
+
         await directory.copy(target_directory, session, ctx.config, force=data.force)
         await session.commit()
 
@@ -177,22 +221,32 @@ async def copy(
 @router.get("/directory/content", response_model=DirectoryContent)
 async def content(
     path: Path,
+    request: Request,
+    response: Response,
     repository: Repository = Depends(middleware.repository),
     ctx: middleware.Context = Depends(),
 ):
-    async with ctx.database.session() as session:
+    async with ctx.database.session(readonly=True) as session:
         directory = await validate_current_directory(
             path, repository, session, ctx.config
         )
-        session.add(directory)
-        await session.refresh(directory, attribute_names=["directories"])
-        await session.refresh(directory, attribute_names=["files"])
-
-        content = DirectoryContent(
-            files=[await _file.info(session) for _file in directory.files],
-            directories=[
-                await _directory.info(session) for _directory in directory.directories
-            ],
+
+        tag = middleware.etag(
+            "content", directory.id, directory.version, FileSystem.normalize(path)
         )
+        if not_modified := middleware.conditional(request, response, tag):
+            return not_modified
+
+        files = await File.rows(session, File.parent_id == directory.id)
+        directories = await Directory.rows(
+            repository.id, session, Directory.parent_id == directory.id
+        )
+
+    parent_path = Path("/").joinpath(FileSystem.normalize(path))
+    for row in (*files, *directories):
+        row["path"] = str(parent_path.joinpath(row["name"]))
 
-    return content
+    return middleware.RawJSONResponse(
+        {"files": files, "directories": directories},
+        headers=middleware.validators(response),
+    )
@@ -1,9 +1,35 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, FastAPI, Request, Response
 from fastapi.responses import HTMLResponse
+from pydantic_core import to_json
+from materia.routers import middleware
 
 router = APIRouter()
 
 
+def openapi_json(app: FastAPI) -> tuple[bytes, str]:
+    """OpenAPI specification of the application serialized once, with its
+    entity tag. Multi-process servers build it before forking workers.
+    """
+    if (prebuilt := getattr(app.state, "openapi_json", None)) is None:
+        content = to_json(app.openapi())
+        prebuilt = app.state.openapi_json = (content, middleware.etag(content))
+
+    return prebuilt
+
+
+@router.get("/openapi.json", include_in_schema=False)
+async def openapi(request: Request):
+    content, etag = openapi_json(request.app)
+    response = Response(content, media_type="application/json")
+
+    if not_modified := middleware.conditional(
+        request, response, etag, cache_control="public, no-cache"
+    ):
+        return not_modified
+
+    return response
+
+
 @router.get("/docs", response_class=HTMLResponse, include_in_schema=False)
 async def rapidoc(request: Request):
     return f"""
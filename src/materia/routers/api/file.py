@@ -10,7 +10,7 @@ from fastapi import (
     File as _File,
     Form,
 )
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from materia.models import (
     User,
     File,
@@ -19,6 +19,7 @@ from materia.models import (
     Repository,
     FileRename,
     FileCopyMove,
+    FilePreview,
 )
 from materia.core import (
     SessionContext,
@@ -26,14 +27,15 @@ from materia.core import (
     FileSystem,
     TemporaryFileTarget,
     Database,
+    metrics,
 )
 from materia.routers import middleware
 from materia.routers.api.directory import validate_target_directory
+from materia.routers.api.tasks import own_task
 from streaming_form_data import StreamingFormDataParser
 from streaming_form_data.targets import ValueTarget
 from starlette.requests import ClientDisconnect
-from aiofiles import ospath as async_path
-from materia.tasks import remove_cache_file
+from materia.tasks import remove_cache_file, schedule_previews
 
 router = APIRouter(tags=["file"])
 
@@ -57,6 +59,32 @@ async def validate_current_file(
     return file
 
 
+async def receive(
+    request: Request,
+    parser: StreamingFormDataParser,
+    target: TemporaryFileTarget,
+    buffer_size: int,
+):
+    """Feed the request body to the parser in batches of at least `buffer_size`
+    bytes instead of every network chunk.
+    """
+    chunks, size = [], 0
+
+    async for chunk in request.stream():
+        chunks.append(chunk)
+        size += len(chunk)
+
+        if size >= buffer_size:
+            parser.data_received(b"".join(chunks))
+            chunks, size = [], 0
+            await target.flush()
+
+    if chunks:
+        parser.data_received(b"".join(chunks))
+
+    await target.close()
+
+
 class FileSizeValidator:
     def __init__(self, capacity: int):
         self.body = 0
@@ -97,38 +125,41 @@ async def create(
         file = TemporaryFileTarget(
             ctx.config.application.working_directory,
             validator=FileSizeValidator(capacity),
+            buffer_size=ctx.config.repository.upload_buffer_size,
+            queue_size=ctx.config.repository.upload_queue_size,
         )
         path = ValueTarget()
 
         ctx.logger.debug(f"Shedule remove cache file: {file.path().name}")
-        remove_cache_file.apply_async(args=(file.path(), ctx.config), countdown=10)
+        remove_cache_file.apply_async(args=(file.path(),), countdown=10)
 
         parser = StreamingFormDataParser(headers=request.headers)
         parser.register("file", file)
         parser.register("path", path)
 
-        async for chunk in request.stream():
-            parser.data_received(chunk)
+        await receive(
+            request, parser, file, ctx.config.repository.upload_buffer_size
+        )
 
     except ClientDisconnect:
-        file.remove()
+        await file.remove()
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Client disconnect")
     except HTTPException as e:
-        file.remove()
+        await file.remove()
         raise e
     except Exception as e:
-        file.remove()
+        await file.remove()
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, " ".join(e.args))
 
     path = Path(path.value.decode())
 
     if not file.multipart_filename:
-        file.remove()
+        await file.remove()
         raise HTTPException(
             status.HTTP_417_EXPECTATION_FAILED, "Cannot upload file without name"
         )
     if not FileSystem.check_path(path):
-        file.remove()
+        await file.remove()
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Invalid path")
 
     async with ctx.database.session() as session:
@@ -137,11 +168,12 @@ async def create(
         )
 
         try:
-            await File(
+            new_file = await File(
                 repository_id=repository.id,
                 parent_id=target_directory.id if target_directory else None,
                 name=file.multipart_filename,
-                size=await async_path.getsize(file.path()),
+                size=await FileSystem(file.path()).size(),
+                content_hash=file.content_hash(),
             ).new(file.path(), session, ctx.config)
         except Exception:
             raise HTTPException(
@@ -149,22 +181,79 @@ async def create(
             )
         else:
             await session.commit()
+            metrics.upload_bytes.inc(new_file.size)
+
+    await schedule_previews(new_file, ctx.config, ctx.cache)
 
 
 @router.get("/file", response_model=FileInfo)
 async def info(
     path: Path,
+    request: Request,
+    response: Response,
     repository: Repository = Depends(middleware.repository),
     ctx: middleware.Context = Depends(),
 ):
-    async with ctx.database.session() as session:
+    async with ctx.database.session(readonly=True) as session:
         file = await validate_current_file(path, repository, session, ctx.config)
 
-        info = file.info()
+        # validated by the ETag alone, `updated` is not bumped by metadata
+        # changes such as `is_public`
+        tag = middleware.etag(
+            file.id,
+            file.updated,
+            file.size,
+            file.content_hash,
+            file.is_public,
+            FileSystem.normalize(path),
+        )
+        if not_modified := middleware.conditional(request, response, tag):
+            return not_modified
+
+        info = await file.info(session)
 
         return info
 
 
+@router.get("/file/preview")
+async def preview(
+    path: Path,
+    request: Request,
+    size: int = 128,
+    repository: Repository = Depends(middleware.repository),
+    ctx: middleware.Context = Depends(),
+):
+    """Preview image of the file. Previews that are not generated yet are
+    queued and answered with 202.
+    """
+    if size not in ctx.config.preview.sizes:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY, "Unsupported preview size"
+        )
+
+    async with ctx.database.session(readonly=True) as session:
+        file = await validate_current_file(path, repository, session, ctx.config)
+        file_preview = await FilePreview.by_file(file, size, session)
+
+    if file_preview is None:
+        if task := await schedule_previews(file, ctx.config, ctx.cache):
+            await own_task(task.id, repository.user_id, ctx.cache)
+            return JSONResponse(
+                {"task_id": task.id}, status_code=status.HTTP_202_ACCEPTED
+            )
+
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Preview not found")
+
+    response = middleware.PassthroughFileResponse(
+        file_preview.path(ctx.config), media_type="image/webp"
+    )
+    tag = middleware.etag("preview", file.id, file.content_hash, size)
+    if not_modified := middleware.conditional(request, response, tag):
+        return not_modified
+
+    return response
+
+
 @router.delete("/file")
 async def remove(
     path: Path,
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from pathlib import PurePosixPath
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from materia.models import (
     User,
     Repository,
@@ -6,6 +8,8 @@ from materia.models import (
     RepositoryContent,
     FileInfo,
     DirectoryInfo,
+    File,
+    Directory,
 )
 from materia.routers import middleware
 
@@ -37,7 +41,7 @@ async def create(
 async def info(
     repository=Depends(middleware.repository), ctx: middleware.Context = Depends()
 ):
-    async with ctx.database.session() as session:
+    async with ctx.database.session(readonly=True) as session:
         return await repository.info(session)
 
 
@@ -56,18 +60,37 @@ async def remove(
 
 @router.get("/repository/content", response_model=RepositoryContent)
 async def content(
-    repository=Depends(middleware.repository), ctx: middleware.Context = Depends()
+    request: Request,
+    response: Response,
+    repository=Depends(middleware.repository),
+    ctx: middleware.Context = Depends(),
 ):
-    async with ctx.database.session() as session:
-        session.add(repository)
-        await session.refresh(repository, attribute_names=["directories"])
-        await session.refresh(repository, attribute_names=["files"])
-
-        content = RepositoryContent(
-            files=[await _file.info(session) for _file in repository.files],
-            directories=[
-                await _directory.info(session) for _directory in repository.directories
-            ],
-        )
-
-    return content
+    tag = middleware.etag("content", repository.id, repository.version)
+    if not_modified := middleware.conditional(request, response, tag):
+        return not_modified
+
+    async with ctx.database.session(readonly=True) as session:
+        files = await File.rows(session, File.repository_id == repository.id)
+        directories = await Directory.rows(repository.id, session)
+
+    # resolve every directory path once from the parent links
+    parents = {row["id"]: row for row in directories}
+    paths: dict[Optional[int], PurePosixPath] = {None: PurePosixPath("/")}
+
+    def directory_path(directory_id: int) -> PurePosixPath:
+        if (path := paths.get(directory_id)) is None:
+            row = parents[directory_id]
+            path = paths[directory_id] = directory_path(row["parent_id"]).joinpath(
+                row["name"]
+            )
+        return path
+
+    for row in directories:
+        row["path"] = str(directory_path(row["id"]))
+    for row in files:
+        row["path"] = str(directory_path(row["parent_id"]).joinpath(row["name"]))
+
+    return middleware.RawJSONResponse(
+        {"files": files, "directories": directories},
+        headers=middleware.validators(response),
+    )
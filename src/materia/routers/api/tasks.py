@@ -1,16 +1,125 @@
+import asyncio
+import json
+from uuid import UUID, uuid4
+from celery import Task, states
 from celery.result import AsyncResult
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from materia.core import Cache, CacheError, Cron
+from materia.models import User
+from materia.routers import middleware
 
 router = APIRouter(tags=["tasks"])
 
+# results are kept by the backend for a day
+task_owner_lifetime = 24 * 60 * 60
 
-@router.get("/tasks/${task_id}")
-async def status_task(task_id):
-    task_result = AsyncResult(task_id)
-    result = {
+
+def task_owners_key(task_id: str) -> str:
+    return f"task_owners_{task_id}"
+
+
+async def own_task(task_id: str, user_id: UUID, cache: Cache):
+    """Allow the user to read the state of the queued task. A task can have
+    several owners, e.g. a preview requested by everyone it is shared with.
+    """
+    key = task_owners_key(task_id)
+
+    async with cache.pipeline() as pipeline:
+        await pipeline.sadd(key, str(user_id)).expire(
+            key, task_owner_lifetime
+        ).execute()
+
+
+async def queue_task(task: Task, user_id: UUID, cache: Cache, *args) -> str:
+    """Queue the task for the user and return its id. The owner is recorded
+    before the task is published, so a queued task can always be polled.
+    """
+    task_id = str(uuid4())
+
+    try:
+        await own_task(task_id, user_id, cache)
+    except CacheError:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE, "Failed to queue the task"
+        )
+
+    # publishing waits for the broker
+    await asyncio.to_thread(task.apply_async, args=args, task_id=task_id)
+
+    return task_id
+
+
+async def validate_task_owner(task_id: str, user: User, cache: Cache):
+    try:
+        async with cache.client() as client:
+            owned = await client.sismember(task_owners_key(task_id), str(user.id))
+    except CacheError:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE, "Failed to check the task owner"
+        )
+
+    if not owned:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Task not found")
+
+
+def task_state(task_id: str) -> dict:
+    if not (cron := Cron.instance()):
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Cron is not ready")
+
+    task_result = AsyncResult(task_id, app=cron.backend)
+    result = task_result.result
+
+    if isinstance(result, Exception):
+        result = {"error": " ".join(map(str, result.args)) or type(result).__name__}
+
+    return {
         "task_id": task_id,
         "task_status": task_result.status,
-        "task_result": task_result.result,
+        "task_result": result,
     }
-    return JSONResponse(result)
+
+
+@router.get("/tasks/{task_id}")
+async def status_task(
+    task_id: str,
+    user: User = Depends(middleware.user),
+    ctx: middleware.Context = Depends(),
+):
+    await validate_task_owner(task_id, user, ctx.cache)
+
+    return JSONResponse(await asyncio.to_thread(task_state, task_id))
+
+
+@router.get("/tasks/{task_id}/stream")
+async def stream_task(
+    task_id: str,
+    request: Request,
+    interval: float = 0.5,
+    user: User = Depends(middleware.user),
+    ctx: middleware.Context = Depends(),
+):
+    """Stream task state as server-sent events until the task is finished."""
+    await validate_task_owner(task_id, user, ctx.cache)
+    interval = min(max(interval, 0.1), 10)
+
+    async def events():
+        previous = None
+
+        while not await request.is_disconnected():
+            current = await asyncio.to_thread(task_state, task_id)
+
+            if current != previous:
+                yield f"data: {json.dumps(current)}\n\n"
+                previous = current
+
+            if current["task_status"] in states.READY_STATES:
+                break
+
+            await asyncio.sleep(interval)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -12,7 +12,7 @@ router = APIRouter(tags=["user"])
 async def info(
     claims=Depends(middleware.jwt_cookie), ctx: middleware.Context = Depends()
 ):
-    async with ctx.database.session() as session:
+    async with ctx.database.session(readonly=True) as session:
         if not (current_user := await User.by_id(uuid.UUID(claims.sub), session)):
             raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Missing user")
 
@@ -25,7 +25,7 @@ async def remove(
 ):
     try:
         async with ctx.database.session() as session:
-            await user.remove(session)
+            await user.remove(session, ctx.config)
             await session.commit()
 
     except Exception as e:
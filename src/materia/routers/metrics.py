@@ -0,0 +1,40 @@
+import secrets
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from materia.core import metrics, CacheError
+from materia.routers import middleware
+
+router = APIRouter(tags=["metrics"])
+
+
+async def scraper(request: Request, ctx: middleware.Context = Depends()):
+    if not (token := ctx.config.metrics.token):
+        return
+
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        credentials.encode(), token.encode()
+    ):
+        raise HTTPException(
+            status.HTTP_401_UNAUTHORIZED,
+            "Invalid token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.get("/metrics", include_in_schema=False, dependencies=[Depends(scraper)])
+async def export(ctx: middleware.Context = Depends()):
+    status = ctx.database.pool_status()
+    metrics.update_database_pool("primary", status)
+    for n, replica_status in enumerate(status.get("replicas", [])):
+        metrics.update_database_pool(f"replica{n}", replica_status)
+
+    try:
+        async with ctx.cache.client() as client:
+            for queue in ctx.config.cron.queues:
+                metrics.cron_queue_depth.labels(queue).set(await client.llen(queue))
+    except CacheError as e:
+        ctx.logger.warning("Failed to read cron queue depth: {}", e)
+
+    content, media_type = metrics.generate()
+
+    return Response(content, media_type=media_type)
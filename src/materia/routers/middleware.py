@@ -1,12 +1,22 @@
 from typing import Optional
+from time import perf_counter, time
+import asyncio
+from email.utils import formatdate, parsedate_to_datetime
+import hashlib
+import math
+import re
 import uuid
 from datetime import datetime
 from pathlib import Path
 from fastapi import HTTPException, Request, Response, status, Depends
+from fastapi.responses import FileResponse
 from fastapi.security.base import SecurityBase
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import jwt
 from sqlalchemy import select
 from pydantic import BaseModel
+from pydantic_core import to_json
 from enum import StrEnum
 from http import HTTPMethod as HttpMethod
 from fastapi.security import (
@@ -19,6 +29,18 @@ from fastapi.security import (
 )
 
 from materia import security
+from materia.core import (
+    Asset,
+    Logger,
+    QueryStats,
+    compress,
+    compressible,
+    encodings,
+    metrics,
+    negotiate,
+    query_stats,
+    read_primary,
+)
 from materia.models import User, Repository
 
 
@@ -28,6 +50,7 @@ class Context:
         self.database = request.state.database
         self.cache = request.state.cache
         self.logger = request.state.logger
+        self.assets = request.state.assets
 
 
 async def jwt_cookie(request: Request, response: Response, ctx: Context = Depends()):
@@ -82,7 +105,7 @@ async def jwt_cookie(request: Request, response: Response, ctx: Context = Depend
     except jwt.PyJWTError as e:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, f"Invalid token: {e}")
 
-    async with ctx.database.session() as session:
+    async with ctx.database.session(readonly=True) as session:
         if not await User.by_id(uuid.UUID(access_claims.sub), session):
             raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid user")
 
@@ -90,15 +113,22 @@ async def jwt_cookie(request: Request, response: Response, ctx: Context = Depend
 
 
 async def user(claims=Depends(jwt_cookie), ctx: Context = Depends()) -> User:
-    async with ctx.database.session() as session:
+    async with ctx.database.session(readonly=True) as session:
         if not (current_user := await User.by_id(uuid.UUID(claims.sub), session)):
             raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Missing user")
 
     return current_user
 
 
+async def admin(user: User = Depends(user)) -> User:
+    if not user.is_admin:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Not enough privileges")
+
+    return user
+
+
 async def repository(user: User = Depends(user), ctx: Context = Depends()):
-    async with ctx.database.session() as session:
+    async with ctx.database.session(readonly=True) as session:
         session.add(user)
         await session.refresh(user, attribute_names=["repository"])
 
@@ -110,3 +140,353 @@ async def repository(user: User = Depends(user), ctx: Context = Depends()):
 
 async def repository_path(user: User = Depends(user), ctx: Context = Depends()) -> Path:
     return ctx.config.data_dir() / "repository" / user.lower_name
+
+
+def etag(*parts) -> str:
+    """Strong entity tag of the given validator values."""
+    digest = hashlib.blake2b(
+        "\x1f".join(map(str, parts)).encode(), digest_size=16
+    ).hexdigest()
+
+    return f'"{digest}"'
+
+
+def conditional(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[int] = None,
+    cache_control: str = "private, no-cache",
+) -> Optional[Response]:
+    """Set validators on the response and return an empty 304 response when
+    If-None-Match or, without it, If-Modified-Since matches them.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+
+    response.headers.update(headers)
+    not_modified = Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if (if_none_match := request.headers.get("if-none-match")) is not None:
+        # weak comparison
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or etag in tags:
+            return not_modified
+    elif last_modified is not None and (
+        if_modified_since := request.headers.get("if-modified-since")
+    ):
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if int(last_modified) <= since.timestamp():
+            return not_modified
+
+    return None
+
+
+class PassthroughFileResponse(FileResponse):
+    """File response that `CompressionMiddleware` passes through untouched,
+    whatever its headers and size are.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        scope["materia.file_response"] = True
+        await super().__call__(scope, receive, send)
+
+
+class RawJSONResponse(Response):
+    """JSON response of plain data serialized by pydantic-core in one pass,
+    skipping response model validation and `jsonable_encoder`.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return to_json(content)
+
+
+def validators(response: Response) -> dict:
+    """Validator headers set by `conditional`, for a response that is
+    returned directly instead of the injected one.
+    """
+    return {
+        name: value
+        for name in ("etag", "last-modified", "cache-control")
+        if (value := response.headers.get(name)) is not None
+    }
+
+
+def static(request: Request, asset: Asset) -> Response:
+    """Send the asset file, or its precompressed variant when the client
+    accepts it, with the asset validators.
+    """
+    encoding = negotiate(request.headers.get("accept-encoding"), list(asset.variants))
+    etag = asset.etag
+
+    if encoding:
+        response = PassthroughFileResponse(
+            asset.variants[encoding], media_type=asset.media_type
+        )
+        response.headers["Content-Encoding"] = encoding
+        # a strong validator differs between encodings of the same asset
+        etag = f'{etag[:-1]}-{encoding}"'
+    else:
+        response = PassthroughFileResponse(asset.path, media_type=asset.media_type)
+
+    if asset.variants:
+        response.headers["Vary"] = "Accept-Encoding"
+
+    if not_modified := conditional(
+        request, response, etag, int(asset.modified), asset.cache_control()
+    ):
+        if asset.variants:
+            not_modified.headers["Vary"] = "Accept-Encoding"
+        return not_modified
+
+    return response
+
+
+class MetricsMiddleware:
+    """Observe latency and body sizes of HTTP requests per route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = perf_counter()
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        request_size = response_size = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                request_size += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            # route template keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+
+            metrics.http_request_duration.labels(
+                scope["method"], route, status_code
+            ).observe(perf_counter() - start)
+            if request_size:
+                metrics.http_request_bytes.labels(route).inc(request_size)
+            if response_size:
+                metrics.http_response_bytes.labels(route).inc(response_size)
+
+
+class QueryStatsMiddleware:
+    """Account database statements to the request that issued them.
+    The request id is taken from `X-Request-ID` when it is a short token,
+    otherwise generated.
+    """
+
+    request_id_pattern = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        request_id = headers.get("x-request-id", "")
+        if not self.request_id_pattern.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        stats = QueryStats(request_id)
+        token = query_stats.set(stats)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                response_headers["X-Request-ID"] = stats.request_id
+                if self.server_timing:
+                    response_headers.append(
+                        "Server-Timing",
+                        'db;dur={:.2f};desc="{} queries"'.format(
+                            stats.duration * 1000, stats.count
+                        ),
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            query_stats.reset(token)
+            metrics.http_request_queries.observe(stats.count)
+
+            if logger := Logger.instance():
+                logger.debug(
+                    "Request [{}] {} {}: {} queries, {:.1f} ms in database",
+                    stats.request_id,
+                    scope["method"],
+                    scope["path"],
+                    stats.count,
+                    stats.duration * 1000,
+                )
+
+
+class ReadYourWritesMiddleware:
+    """Keep the reads of a client on the primary database for `lag_window`
+    seconds after its last mutating request, so that it sees its own writes
+    whatever the replica lag is. The time of the last write is kept by the
+    client in a cookie, other clients keep reading from the replicas.
+
+    Mutating requests read from the primary as a whole, so objects loaded by
+    the read-only sessions of dependencies are safe to write through.
+    """
+
+    cookie_name = "materia_last_write"
+    safe_methods = {"GET", "HEAD", "OPTIONS"}
+
+    def __init__(self, app: ASGIApp, lag_window: float = 5.0):
+        self.app = app
+        self.lag_window = lag_window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        mutating = scope["method"] not in self.safe_methods
+        token = read_primary.set(mutating or self.recently_written(scope))
+
+        async def send_wrapper(message: Message):
+            if (
+                mutating
+                and message["type"] == "http.response.start"
+                and message["status"] < 400
+            ):
+                response_headers = MutableHeaders(scope=message)
+                response_headers.append(
+                    "Set-Cookie",
+                    "{}={}; Max-Age={}; Path=/; HttpOnly; SameSite=Lax".format(
+                        self.cookie_name, int(time()), math.ceil(self.lag_window)
+                    ),
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            read_primary.reset(token)
+
+    def recently_written(self, scope: Scope) -> bool:
+        try:
+            last_write = int(Request(scope).cookies.get(self.cookie_name, ""))
+        except ValueError:
+            return False
+
+        return time() - last_write < self.lag_window
+
+
+class CompressionMiddleware:
+    """Compress complete response bodies of compressible media types with the
+    best content coding the client accepts.
+
+    Streamed responses (more than one body message), file responses (see
+    `PassthroughFileResponse`), ranges and already encoded bodies are passed
+    through untouched.
+    """
+
+    # fast levels, the body is compressed for every request
+    levels = {"zstd": 3, "br": 4, "gzip": 6}
+    # larger bodies are compressed in a thread instead of on the event loop
+    thread_size = 256 << 10
+
+    def __init__(self, app: ASGIApp, min_size: int = 1024):
+        self.app = app
+        self.min_size = min_size
+        self.encodings = encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = negotiate(
+            Headers(scope=scope).get("accept-encoding"), self.encodings
+        )
+        if not encoding:
+            return await self.app(scope, receive, send)
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start, passthrough
+
+            if passthrough:
+                return await send(message)
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if scope.get("materia.file_response") or self.skip(
+                    message["status"], headers
+                ):
+                    passthrough = True
+                    return await send(message)
+
+                start = message
+                return
+
+            if message["type"] != "http.response.body" or start is None:
+                # e.g. http.response.pathsend of a file response
+                passthrough = True
+                if start is not None:
+                    await send(start)
+                return await send(message)
+
+            body = message.get("body", b"")
+            passthrough = True
+
+            if message.get("more_body", False) or len(body) < self.min_size:
+                await send(start)
+                return await send(message)
+
+            if len(body) >= self.thread_size:
+                compressed = await asyncio.to_thread(
+                    compress, body, encoding, self.levels[encoding]
+                )
+            else:
+                compressed = compress(body, encoding, self.levels[encoding])
+
+            headers = MutableHeaders(scope=start)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            if (etag := headers.get("etag")) and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def skip(status_code: int, headers: Headers) -> bool:
+        return (
+            status_code < 200
+            or status_code in (204, 206, 304)
+            or "content-encoding" in headers
+            or "content-range" in headers
+            or "no-transform" in headers.get("cache-control", "")
+            or not compressible(headers.get("content-type"))
+        )
@@ -1,42 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
-from PIL import Image
-import io
-from pathlib import Path
-import mimetypes
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Response
 
 from materia.routers import middleware
-from materia.core import Config
+from materia.models import User, UserError
+from materia.models.user import avatar_formats, avatar_sizes
 
 router = APIRouter(tags=["resources"], prefix="/resources")
 
 
 @router.get("/avatars/{avatar_id}")
 async def avatar(
-    avatar_id: str, format: str = "png", ctx: middleware.Context = Depends()
+    avatar_id: str,
+    format: str = "png",
+    size: Optional[int] = None,
+    ctx: middleware.Context = Depends(),
 ):
-    avatar_path = Config.data_dir() / "avatars" / avatar_id
     format = format.upper()
 
-    if not avatar_path.exists():
+    if not avatar_id.isalnum():
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Failed to find the given avatar")
+    if format not in avatar_formats or (size is not None and size not in avatar_sizes):
         raise HTTPException(
-            status.HTTP_404_NOT_FOUND, "Failed to find the given avatar"
+            status.HTTP_422_UNPROCESSABLE_ENTITY, "Unsupported avatar format or size"
         )
 
     try:
-        img = Image.open(avatar_path)
-        buffer = io.BytesIO()
-
-        if format == "JPEG":
-            img.convert("RGB")
-
-        img.save(buffer, format=format)
-
-    except OSError:
+        path = await User.avatar_variant(avatar_id, format, size, ctx.config)
+    except UserError:
         raise HTTPException(
             status.HTTP_422_UNPROCESSABLE_ENTITY, "Failed to process image file"
         )
 
-    return Response(content=buffer.getvalue(), media_type=Image.MIME[format])
+    if path is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Failed to find the given avatar")
+
+    # a new avatar gets a new id, so variants never change
+    return middleware.PassthroughFileResponse(
+        path,
+        media_type=avatar_formats[format],
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
 
 
 try:
@@ -46,15 +49,12 @@ except ModuleNotFoundError:
 else:
 
     @router.get("/assets/{filename}")
-    async def assets(filename: str):
-        path = Path(materia_frontend.__path__[0]).joinpath(
-            "dist", "resources", "assets", filename
-        )
-
-        if not path.exists():
+    async def assets(
+        filename: str, request: Request, ctx: middleware.Context = Depends()
+    ):
+        if not (manifest := ctx.assets.get("frontend")) or not (
+            asset := manifest.get(f"resources/assets/{filename}")
+        ):
             return Response(status_code=status.HTTP_404_NOT_FOUND)
 
-        content = path.read_bytes()
-        mime = mimetypes.guess_type(path)[0]
-
-        return Response(content, media_type=mime)
+        return middleware.static(request, asset)
@@ -1,10 +1,10 @@
 from typing import Literal
 
-import bcrypt
-
 
 def hash_password(password: str, algo: Literal["bcrypt"] = "bcrypt") -> str:
     if algo == "bcrypt":
+        import bcrypt
+
         return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
     else:
         raise NotImplementedError(algo)
@@ -14,6 +14,8 @@ def validate_password(
     password: str, hash: str, algo: Literal["bcrypt"] = "bcrypt"
 ) -> bool:
     if algo == "bcrypt":
+        import bcrypt
+
         return bcrypt.checkpw(password.encode(), hash.encode())
     else:
         raise NotImplementedError(algo)
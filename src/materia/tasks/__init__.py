@@ -1 +1,3 @@
 from materia.tasks.file import remove_cache_file
+from materia.tasks.directory import copy_directory, move_directory, remove_directory
+from materia.tasks.preview import generate_previews, schedule_previews
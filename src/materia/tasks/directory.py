@@ -0,0 +1,136 @@
+from time import monotonic
+from typing import Literal, Optional
+from pathlib import Path
+import asyncio
+from celery import shared_task, Task
+from sqlalchemy.pool import NullPool
+from materia.core import Config, Cron, Database, FileSystem
+from materia.models import Repository, Directory
+
+
+class DirectoryTaskError(Exception):
+    pass
+
+
+class TaskProgress:
+    """Accumulate progress of a tree operation and publish it as task state.
+    Updates are throttled to avoid a broker round trip on every entry.
+    """
+
+    def __init__(self, task: Task, operation: str, interval: float = 0.5):
+        self.task = task
+        # the request context is thread local, callbacks may come from io threads
+        self.task_id = task.request.id
+        self.operation = operation
+        self.interval = interval
+        self.entries = 0
+        self.bytes = 0
+        self.last_update = 0.0
+
+    def __call__(self, entries: int, size: int):
+        self.entries += entries
+        self.bytes += size
+
+        if (now := monotonic()) - self.last_update >= self.interval:
+            self.last_update = now
+            self.task.update_state(
+                task_id=self.task_id, state="PROGRESS", meta=self.meta()
+            )
+
+    def meta(self) -> dict:
+        return {
+            "operation": self.operation,
+            "entries": self.entries,
+            "bytes": self.bytes,
+        }
+
+
+async def _by_path(
+    repository: Repository, path: Path, session, config: Config
+) -> Optional[Directory]:
+    if FileSystem.normalize(path) == Path():
+        return None
+
+    if not (
+        directory := await Directory.by_path(
+            repository, FileSystem.normalize(path), session, config
+        )
+    ):
+        raise DirectoryTaskError(f"Directory not found: {path}")
+
+    return directory
+
+
+def _run(
+    task: Task,
+    operation: Literal["copy", "move", "remove"],
+    repository_id: int,
+    path: Path,
+    target: Optional[Path],
+    force: bool,
+) -> dict:
+    config = Cron.config_instance()
+    progress = TaskProgress(task, operation)
+
+    async def wrapper():
+        database = await Database.new(
+            config.database.url(), poolclass=NullPool, test_connection=False
+        )
+
+        try:
+            async with database.session() as session:
+                if not (repository := await session.get(Repository, repository_id)):
+                    raise DirectoryTaskError("Repository not found")
+
+                if not (directory := await _by_path(repository, path, session, config)):
+                    raise DirectoryTaskError("Cannot operate on the repository root")
+
+                if operation == "remove":
+                    await directory.remove(session, config, progress=progress)
+                else:
+                    target_directory = await _by_path(
+                        repository, target, session, config
+                    )
+                    method = directory.copy if operation == "copy" else directory.move
+                    await method(
+                        target_directory,
+                        session,
+                        config,
+                        force=force,
+                        progress=progress,
+                    )
+
+                await session.commit()
+        finally:
+            await database.dispose()
+
+    asyncio.run(wrapper())
+
+    return progress.meta()
+
+
+@shared_task(name="copy_directory", bind=True)
+def copy_directory(
+    self: Task,
+    repository_id: int,
+    path: Path,
+    target: Path,
+    force: bool,
+) -> dict:
+    return _run(self, "copy", repository_id, path, target, force)
+
+
+@shared_task(name="move_directory", bind=True)
+def move_directory(
+    self: Task,
+    repository_id: int,
+    path: Path,
+    target: Path,
+    force: bool,
+) -> dict:
+    return _run(self, "move", repository_id, path, target, force)
+
+
+@shared_task(name="remove_directory", bind=True)
+def remove_directory(self: Task, repository_id: int, path: Path) -> dict:
+    return _run(self, "remove", repository_id, path, None, False)
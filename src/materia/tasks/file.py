@@ -8,7 +8,8 @@ from materia.core import FileSystem, Config
 
 
 @shared_task(name="remove_cache_file")
-def remove_cache_file(path: Path, config: Config):
+def remove_cache_file(path: Path):
+    config = Cron.config_instance()
     target = FileSystem(path, config.application.working_directory.joinpath("cache"))
 
     async def wrapper():
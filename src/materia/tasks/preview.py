@@ -0,0 +1,175 @@
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+import asyncio
+import mimetypes
+import os
+from celery import shared_task
+from celery.result import AsyncResult
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.pool import NullPool
+from materia.core import Cache, CacheError, Config, Cron, Database, Logger
+from materia.models import File, FilePreview
+
+# bounds the time a lost task blocks new ones for the same file
+preview_task_lifetime = 60 * 60
+
+
+def preview_task_key(file_id: int, content_hash: Optional[str]) -> str:
+    return "preview_task_{}_{}".format(file_id, content_hash)
+
+
+def media_type(name: str) -> Optional[str]:
+    """Media type of a file that previews can be rendered for."""
+    guessed = mimetypes.guess_type(name)[0]
+
+    if guessed == "application/pdf" and find_spec("pypdfium2"):
+        return guessed
+    if guessed and guessed.startswith("image/") and guessed != "image/svg+xml":
+        return guessed
+
+    return None
+
+
+def render_previews(
+    source: Path, directory: Path, sizes: list[int], media_type: str
+) -> list[int]:
+    """Render WebP previews of the file fitted into every size."""
+    from PIL import Image
+
+    if media_type == "application/pdf":
+        import pypdfium2
+
+        document = pypdfium2.PdfDocument(source)
+        page = document[0]
+        width, height = page.get_size()
+        image = page.render(scale=max(sizes) / max(width, height, 1)).to_pil()
+        document.close()
+    else:
+        image = Image.open(source)
+        # decode a reduced JPEG directly instead of the full resolution
+        image.draft("RGB", (max(sizes), max(sizes)))
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    rendered = []
+
+    for size in sorted(sizes, reverse=True):
+        image.thumbnail((size, size))
+        target = directory.joinpath(f"{size}.webp")
+        temporary = directory.joinpath(f".{uuid4()}.webp")
+        image.save(temporary, format="WEBP", quality=80)
+        os.replace(temporary, target)
+        rendered.append(size)
+
+    return rendered
+
+
+@shared_task(name="generate_previews")
+def generate_previews(file_id: int, content_hash: Optional[str] = None) -> list[int]:
+    config = Cron.config_instance()
+
+    async def wrapper() -> list[int]:
+        database = await Database.new(
+            config.database.url(), poolclass=NullPool, test_connection=False
+        )
+
+        try:
+            async with database.session() as session:
+                if not (file := await session.get(File, file_id)):
+                    return []
+                if not (file_media_type := media_type(file.name)):
+                    return []
+
+                file_path = await file.real_path(session, config)
+
+            # rendered in the worker process, the CPU used by previews is
+            # bounded by the concurrency of the workers of their queue
+            sizes = await asyncio.to_thread(
+                render_previews,
+                file_path,
+                FilePreview.directory(file_id, config),
+                config.preview.sizes,
+                file_media_type,
+            )
+
+            if sizes:
+                async with database.session() as session:
+                    await session.execute(
+                        insert(FilePreview)
+                        .values([{"file_id": file_id, "size": size} for size in sizes])
+                        .on_conflict_do_nothing()
+                    )
+                    await session.commit()
+
+            return sizes
+        finally:
+            await database.dispose()
+
+            # previews of the content can be requested again
+            cache = await Cache.new(config.cache.url(), test_connection=False)
+            try:
+                async with cache.client() as client:
+                    await client.delete(preview_task_key(file_id, content_hash))
+            except CacheError:
+                pass
+            finally:
+                await cache.dispose()
+
+    return asyncio.run(wrapper())
+
+
+def preview_queue(config: Config) -> str:
+    return config.cron.routes.get("generate_previews") or (
+        config.cron.queues[0] if config.cron.queues else "celery"
+    )
+
+
+async def schedule_previews(
+    file: File, config: Config, cache: Cache
+) -> Optional[AsyncResult]:
+    """Queue preview generation for the file, unless it has no previews or
+    the queue is longer than `preview.queue_limit`. Skipped previews are
+    queued again when they are requested. While a task for the content of
+    the file is queued or running, that task is returned instead.
+    """
+    if not config.preview.enabled or not media_type(file.name):
+        return None
+
+    queue = preview_queue(config)
+    key = preview_task_key(file.id, file.content_hash)
+    task_id = str(uuid4())
+
+    try:
+        async with cache.client() as client:
+            if current_task_id := await client.get(key):
+                return generate_previews.AsyncResult(current_task_id)
+
+            if await client.llen(queue) >= config.preview.queue_limit:
+                if logger := Logger.instance():
+                    logger.debug("Preview queue is full, skip file {}", file.id)
+                return None
+
+            if not await client.set(key, task_id, nx=True, ex=preview_task_lifetime):
+                # queued by a concurrent request
+                if current_task_id := await client.get(key):
+                    return generate_previews.AsyncResult(current_task_id)
+                return None
+    except CacheError:
+        return None
+
+    try:
+        # publishing waits for the broker
+        return await asyncio.to_thread(
+            generate_previews.apply_async,
+            args=(file.id, file.content_hash),
+            queue=queue,
+            task_id=task_id,
+        )
+    except Exception:
+        async with cache.client() as client:
+            await client.delete(key)
+        raise
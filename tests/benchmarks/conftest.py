@@ -0,0 +1,66 @@
+"""Benchmarks of the storage API, run separately from the functional tests:
+
+    pdm run bench
+
+Results are saved as JSON under .benchmarks/ by pytest-benchmark; load
+generator results are stored in `extra_info` of every benchmark. Compare a
+run against a saved one with `--benchmark-compare`.
+
+Most benchmarks drive the app in process. Settings applied by the server
+process itself, the event loop, the HTTP implementation and the upload
+buffer, are measured against `materia start` processes in test_server.py.
+"""
+
+from pathlib import Path
+from typing import Callable
+import pytest
+from materia.core import Config
+from tests.benchmarks.harness import AppThread, ServerProcess, authorize
+
+
+@pytest.fixture()
+def app_thread(api_config: Config) -> AppThread:
+    app_thread = AppThread(api_config)
+    app_thread.start()
+
+    yield app_thread
+
+    app_thread.stop()
+
+
+@pytest.fixture()
+def bench_app(app_thread: AppThread) -> AppThread:
+    app_thread.run(authorize(app_thread.client))
+
+    return app_thread
+
+
+@pytest.fixture()
+def server_process(
+    api_config: Config, tmp_path: Path
+) -> Callable[..., ServerProcess]:
+    """Start a server process with configuration sections updated by the
+    keyword arguments, e.g. `server_process(server={"loop": "uvloop"})`.
+    """
+    processes = []
+
+    def start(**sections: dict) -> ServerProcess:
+        config = api_config.model_copy(deep=True)
+        config.server.port = 54611
+        config.log.level = "warning"
+        for section, values in sections.items():
+            setattr(config, section, getattr(config, section).model_copy(update=values))
+
+        process = ServerProcess(
+            config, tmp_path.joinpath(f"config-{len(processes)}.toml")
+        )
+        process.start()
+        processes.append(process)
+        process.run(authorize(process.client))
+
+        return process
+
+    yield start
+
+    for process in processes:
+        process.stop()
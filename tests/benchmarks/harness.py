@@ -0,0 +1,215 @@
+"""In-process app, server process and async load generator for the
+benchmarks."""
+
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from pathlib import Path
+from threading import Thread
+from time import monotonic, perf_counter
+from typing import (
+    Any,
+    AsyncContextManager,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Optional,
+    TypeVar,
+)
+import asyncio
+import os
+import subprocess
+import sys
+
+from asgi_lifespan import LifespanManager
+from httpx import AsyncClient, ASGITransport, TransportError
+from materia.app import Application
+from materia.app.bench import percentile
+from materia.core import Config
+
+T = TypeVar("T")
+
+MiB = 1 << 20
+
+CREDENTIALS = {
+    "name": "benchmark",
+    "password": "iambenchmark",
+    "email": "benchmark@example.com",
+}
+
+
+class ClientThread:
+    """HTTP client of a server on an event loop of a background thread, so
+    that the synchronous targets of pytest-benchmark drive it and connections
+    are kept between rounds. Subclasses provide the server in `connect`.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.loop = asyncio.new_event_loop()
+        self.thread = Thread(target=self.loop.run_forever, daemon=True)
+        self.client: Optional[AsyncClient] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._served: Optional[Future] = None
+
+    def start(self):
+        self.thread.start()
+        ready = Future()
+        self._served = asyncio.run_coroutine_threadsafe(self.serve(ready), self.loop)
+        ready.result()
+
+    def stop(self):
+        if self._stopped is not None:
+            self.loop.call_soon_threadsafe(self._stopped.set)
+        self._served.result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def connect(self) -> AsyncContextManager[AsyncClient]:
+        raise NotImplementedError()
+
+    async def serve(self, ready: Future):
+        self._stopped = asyncio.Event()
+
+        try:
+            async with self.connect() as client:
+                self.client = client
+                ready.set_result(None)
+                await self._stopped.wait()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+            raise
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+
+class AppThread(ClientThread):
+    """The ASGI app in process with its own database, cache and cron
+    connections.
+    """
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator[AsyncClient]:
+        app = Application(self.config)
+        app.prepare_server()
+
+        async with LifespanManager(app.backend) as manager:
+            async with AsyncClient(
+                transport=ASGITransport(app=manager.app),
+                base_url=self.config.server.url(),
+                timeout=None,
+            ) as client:
+                yield client
+
+
+class ServerProcess(ClientThread):
+    """`materia start` in a child process, for benchmarks of settings that
+    are applied by the server process itself, e.g. the event loop.
+    """
+
+    def __init__(self, config: Config, path: Path):
+        super().__init__(config)
+        self.path = path
+        self.process: Optional[subprocess.Popen] = None
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator[AsyncClient]:
+        self.config.write(self.path)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "materia", "start", "--config", str(self.path)],
+            stdout=subprocess.DEVNULL,
+        )
+
+        try:
+            async with AsyncClient(
+                base_url=self.config.server.url(), timeout=None
+            ) as client:
+                await wait_ready(client, self.process)
+                yield client
+        finally:
+            self.process.terminate()
+            await asyncio.to_thread(self.process.wait)
+
+    def cpu_time(self) -> float:
+        """User and system CPU seconds of the server, read from /proc."""
+        stat = Path(f"/proc/{self.process.pid}/stat").read_text()
+        fields = stat.rsplit(")", 1)[1].split()
+
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def wait_ready(
+    client: AsyncClient, process: subprocess.Popen, timeout: float = 30
+):
+    deadline = monotonic() + timeout
+
+    while monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            await client.get("/api/openapi.json")
+        except TransportError:
+            await asyncio.sleep(0.2)
+        else:
+            return
+
+    raise TimeoutError("Server is not ready")
+
+
+async def authorize(client: AsyncClient):
+    await client.post("/api/auth/signup", json=CREDENTIALS)
+    response = await client.post("/api/auth/signin", json=CREDENTIALS)
+    response.raise_for_status()
+    client.cookies = response.cookies
+
+    response = await client.post("/api/repository")
+    response.raise_for_status()
+
+
+async def upload(client: AsyncClient, directory: str, name: str, data: bytes):
+    response = await client.post(
+        "/api/file", files={"file": (name, data)}, data={"path": directory}
+    )
+    response.raise_for_status()
+
+
+async def generate_load(
+    operation: Callable[[int], Awaitable[Any]], requests: int, concurrency: int
+) -> dict:
+    """Run the operation `requests` times from `concurrency` concurrent
+    workers. The operation receives the request index and fails by raising.
+    """
+    indices = iter(range(requests))
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+
+        for index in indices:
+            start = perf_counter()
+            try:
+                await operation(index)
+            except Exception:
+                errors += 1
+            latencies.append(perf_counter() - start)
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = perf_counter() - started
+
+    latencies.sort()
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput": requests / elapsed,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": latencies[-1] if latencies else 0.0,
+    }
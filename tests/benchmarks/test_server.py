@@ -0,0 +1,68 @@
+from importlib.util import find_spec
+from itertools import count
+from pathlib import Path
+import os
+
+import pytest
+from tests.benchmarks.harness import MiB, generate_load, upload
+
+loops = [
+    "asyncio",
+    pytest.param(
+        "uvloop",
+        marks=pytest.mark.skipif(not find_spec("uvloop"), reason="uvloop"),
+    ),
+]
+https = [
+    "h11",
+    pytest.param(
+        "httptools",
+        marks=pytest.mark.skipif(not find_spec("httptools"), reason="httptools"),
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "endpoint",
+    [
+        "/api/openapi.json",
+        "/api/user",
+        "/api/repository",
+        "/api/repository/content",
+    ],
+)
+@pytest.mark.parametrize("http", https)
+@pytest.mark.parametrize("loop", loops)
+def test_server(benchmark, server_process, loop: str, http: str, endpoint: str):
+    server = server_process(server={"loop": loop, "http": http})
+
+    async def request(index: int = 0):
+        response = await server.client.get(endpoint)
+        response.raise_for_status()
+
+    benchmark(lambda: server.run(request()))
+    benchmark.extra_info["load"] = server.run(generate_load(request, 1000, 32))
+
+
+@pytest.mark.skipif(not Path("/proc/self/stat").exists(), reason="procfs")
+@pytest.mark.parametrize("buffer_size", [64 << 10, 1 << 20, 4 << 20])
+def test_upload_buffer(benchmark, server_process, buffer_size: int):
+    server = server_process(repository={"upload_buffer_size": buffer_size})
+    data = os.urandom(64 * MiB)
+    names = count()
+    rounds = 5
+
+    cpu_started = server.cpu_time()
+    benchmark.pedantic(
+        lambda: server.run(
+            upload(server.client, "/", f"upload-{next(names)}.bin", data)
+        ),
+        rounds=rounds,
+    )
+    cpu = server.cpu_time() - cpu_started
+
+    benchmark.extra_info["cpu_per_gb"] = cpu / (rounds * len(data) / (1 << 30))
+    if benchmark.stats:
+        benchmark.extra_info["throughput"] = (
+            len(data) / MiB / benchmark.stats.stats.mean
+        )
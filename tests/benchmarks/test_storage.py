@@ -0,0 +1,176 @@
+from itertools import count, cycle
+from pathlib import PurePosixPath
+import os
+
+import pytest
+from httpx import AsyncClient
+from tests.benchmarks.harness import (
+    CREDENTIALS,
+    MiB,
+    AppThread,
+    generate_load,
+    upload,
+)
+
+
+async def make_directory(client: AsyncClient, path: str):
+    response = await client.post("/api/directory", json={"path": path})
+    response.raise_for_status()
+
+
+async def make_tree(
+    client: AsyncClient, root: str, width: int, depth: int, files: int
+) -> int:
+    """Directories of `width` subdirectories `depth` levels deep with `files`
+    small files in every directory. Returns the number of entries.
+    """
+    directories = [str(PurePosixPath(root))]
+    level = directories
+
+    for _ in range(depth):
+        level = [
+            str(PurePosixPath(parent, f"dir-{index}"))
+            for parent in level
+            for index in range(width)
+        ]
+        directories += level
+
+    # parents are created along with the deepest directories
+    for directory in level:
+        await make_directory(client, directory)
+
+    result = await generate_load(
+        lambda index: upload(
+            client,
+            directories[index // files],
+            f"file-{index % files}.txt",
+            b"materia",
+        ),
+        len(directories) * files,
+        8,
+    )
+    assert result["errors"] == 0
+
+    return len(directories) * (files + 1)
+
+
+@pytest.mark.parametrize("size", [1 * MiB, 64 * MiB])
+def test_upload(benchmark, bench_app: AppThread, size: int):
+    data = os.urandom(size)
+    names = count()
+
+    benchmark.pedantic(
+        lambda: bench_app.run(
+            upload(bench_app.client, "/", f"upload-{next(names)}.bin", data)
+        ),
+        rounds=5,
+    )
+
+    if benchmark.stats:
+        benchmark.extra_info["throughput"] = size / MiB / benchmark.stats.stats.mean
+
+
+@pytest.mark.parametrize("entries", [10, 100, 1000])
+@pytest.mark.parametrize("depth", [1, 16])
+def test_listing(benchmark, bench_app: AppThread, entries: int, depth: int):
+    path = "/" + "/".join(f"level-{level}" for level in range(depth))
+    bench_app.run(make_tree(bench_app.client, path, 0, 0, entries))
+
+    async def listing(index: int = 0):
+        response = await bench_app.client.get(
+            "/api/directory/content", params={"path": path}
+        )
+        response.raise_for_status()
+        assert len(response.json()["files"]) == entries
+
+    benchmark(lambda: bench_app.run(listing()))
+    benchmark.extra_info["load"] = bench_app.run(generate_load(listing, 200, 32))
+
+
+@pytest.fixture()
+def tree(bench_app: AppThread) -> int:
+    return bench_app.run(make_tree(bench_app.client, "/tree", 4, 3, 8))
+
+
+def test_copy(benchmark, bench_app: AppThread, tree: int):
+    targets = count()
+
+    def setup():
+        target = f"/copy-{next(targets)}"
+        bench_app.run(make_directory(bench_app.client, target))
+        return (target,), {}
+
+    async def copy(target: str):
+        response = await bench_app.client.post(
+            "/api/directory/copy", json={"path": "/tree", "target": target}
+        )
+        response.raise_for_status()
+
+    benchmark.pedantic(
+        lambda target: bench_app.run(copy(target)), setup=setup, rounds=3
+    )
+    benchmark.extra_info["entries"] = tree
+
+
+def test_move(benchmark, bench_app: AppThread, tree: int):
+    for target in ("/left", "/right"):
+        bench_app.run(make_directory(bench_app.client, target))
+
+    async def move(source: str, target: str):
+        response = await bench_app.client.patch(
+            "/api/directory/move",
+            json={"path": str(PurePosixPath(source, "tree")), "target": target},
+        )
+        response.raise_for_status()
+
+    # the tree travels between the two directories
+    bench_app.run(move("/", "/left"))
+    sides = cycle([("/left", "/right"), ("/right", "/left")])
+
+    benchmark.pedantic(lambda: bench_app.run(move(*next(sides))), rounds=5)
+    benchmark.extra_info["entries"] = tree
+
+
+def test_delete(benchmark, bench_app: AppThread, tree: int):
+    copies = count()
+
+    async def make_copy() -> str:
+        target = f"/delete-{next(copies)}"
+        await make_directory(bench_app.client, target)
+        response = await bench_app.client.post(
+            "/api/directory/copy", json={"path": "/tree", "target": target}
+        )
+        response.raise_for_status()
+
+        return f"{target}/tree"
+
+    async def delete(path: str):
+        response = await bench_app.client.delete(
+            "/api/directory", params={"path": path}
+        )
+        response.raise_for_status()
+
+    benchmark.pedantic(
+        lambda path: bench_app.run(delete(path)),
+        setup=lambda: ((bench_app.run(make_copy()),), {}),
+        rounds=3,
+    )
+    benchmark.extra_info["entries"] = tree
+
+
+def test_signin(benchmark, bench_app: AppThread):
+    async def signin(index: int = 0):
+        response = await bench_app.client.post("/api/auth/signin", json=CREDENTIALS)
+        response.raise_for_status()
+
+    benchmark(lambda: bench_app.run(signin()))
+    benchmark.extra_info["load"] = bench_app.run(generate_load(signin, 50, 8))
+
+
+def test_authorized_request(benchmark, bench_app: AppThread):
+    async def user(index: int = 0):
+        response = await bench_app.client.get("/api/user")
+        response.raise_for_status()
+
+    benchmark(lambda: bench_app.run(user()))
+    benchmark.extra_info["load"] = bench_app.run(generate_load(user, 500, 32))
@@ -71,6 +71,7 @@ async def cron(config: Config) -> Cache:
         config.cron.workers_count,
         backend_url=config.cache.url(),
         broker_url=config.cache.url(),
+        config=config,
     )
 
     yield cron_pytest
@@ -1,7 +1,12 @@
 import pytest
-from materia.core import Config
-from httpx import AsyncClient, Cookies
+from materia.core import Config, Cron, content_hash
+import asyncio
+from httpx import AsyncClient, ASGITransport, Cookies
 from io import BytesIO
+from pathlib import Path
+import json
+import subprocess
+import sys
 
 # TODO: replace downloadable images for tests
 
@@ -55,8 +60,21 @@ async def test_user(auth_client: AsyncClient, api_config: Config):
         "avatars", avatar_info
     ).exists()
 
+    variant = await auth_client.get(
+        f"/resources/avatars/{avatar_info}", params={"format": "webp", "size": 64}
+    )
+    assert variant.status_code == 200, variant.text
+    assert variant.headers["content-type"] == "image/webp"
+    assert "immutable" in variant.headers["cache-control"]
+    assert api_config.application.working_directory.joinpath(
+        "avatars", "variants", avatar_info, "64.webp"
+    ).exists()
+
     avatar = await auth_client.delete("/api/user/avatar")
     assert avatar.status_code == 200, avatar.text
+    assert not api_config.application.working_directory.joinpath(
+        "avatars", "variants", avatar_info
+    ).exists()
 
     info = await auth_client.get("/api/user")
     assert info.json()["avatar"] is None
@@ -189,3 +207,247 @@ async def test_file(auth_client: AsyncClient, api_config: Config):
         "/api/file", files={"file": ("pytest.png", pytest_logo)}, data={"path": "/"}
     )
     assert create.status_code == 200, create.text
+
+    info = await auth_client.get("/api/file", params={"path": "/pytest.png"})
+    assert info.status_code == 200, info.text
+    assert info.json()["content_hash"] == content_hash(pytest_logo_res.content)
+
+    preview = await auth_client.get(
+        "/api/file/preview", params={"path": "/pytest.png", "size": 128}
+    )
+    assert preview.status_code in (200, 202), preview.text
+
+    # the task queued for the content is shared while it runs
+    if preview.status_code == 202:
+        again = await auth_client.get(
+            "/api/file/preview", params={"path": "/pytest.png", "size": 128}
+        )
+        if again.status_code == 202:
+            assert again.json()["task_id"] == preview.json()["task_id"]
+
+
+@pytest.mark.asyncio
+async def test_directory_background(
+    auth_client: AsyncClient, api_config: Config, cron: Cron
+):
+    from celery import states
+    from materia.tasks import copy_directory
+    from materia.tasks.directory import TaskProgress
+
+    create = await auth_client.post("/api/repository")
+    assert create.status_code == 200, create.text
+
+    create = await auth_client.post("/api/directory", json={"path": "/first_dir"})
+    assert create.status_code == 200, create.text
+
+    copy = await auth_client.post(
+        "/api/directory/copy",
+        params=[("async", "true")],
+        json={"path": "/first_dir", "target": "/", "force": True},
+    )
+    assert copy.status_code == 200, copy.text
+    task_id = copy.json()["task_id"]
+
+    task = await auth_client.get(f"/api/tasks/{task_id}")
+    assert task.status_code == 200, task.text
+    assert task.json()["task_id"] == task_id
+
+    # progress of a running task is published as its state
+    progress = TaskProgress(copy_directory, "copy", interval=0)
+    progress.task_id = task_id
+    await asyncio.to_thread(progress, 2, 1024)
+
+    task = await auth_client.get(f"/api/tasks/{task_id}")
+    assert task.status_code == 200, task.text
+    assert task.json()["task_status"] == "PROGRESS"
+    assert task.json()["task_result"] == {
+        "operation": "copy",
+        "entries": 2,
+        "bytes": 1024,
+    }
+
+    # the stream sends the state until the task is finished
+    await asyncio.to_thread(
+        cron.backend.backend.store_result, task_id, progress.meta(), states.SUCCESS
+    )
+    async with auth_client.stream(
+        "GET", f"/api/tasks/{task_id}/stream", params={"interval": 0.1}
+    ) as stream:
+        assert stream.status_code == 200
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        events = [
+            json.loads(line.removeprefix("data: "))
+            async for line in stream.aiter_lines()
+            if line.startswith("data: ")
+        ]
+    assert events[-1]["task_status"] == "SUCCESS"
+    assert events[-1]["task_result"] == progress.meta()
+
+    # tasks of other users are not visible
+    task = await auth_client.get("/api/tasks/00000000-0000-0000-0000-000000000000")
+    assert task.status_code == 404, task.text
+
+
+@pytest.mark.asyncio
+async def test_admin(auth_client: AsyncClient, api_config: Config):
+    # first registered user is admin
+    metrics = await auth_client.get("/api/admin/metrics")
+    assert metrics.status_code == 200, metrics.text
+    assert "pool" in metrics.json()["database"]
+
+    tasks = await auth_client.get("/api/admin/tasks")
+    assert tasks.status_code == 200, tasks.text
+    assert tasks.json()["tasks"]
+
+    profile = await auth_client.get("/api/admin/profile", params={"seconds": 0.1})
+    assert profile.status_code == 200, profile.text
+
+
+@pytest.mark.asyncio
+async def test_request_id(api_client: AsyncClient):
+    response = await api_client.get("/api/user", headers={"X-Request-ID": "pytest"})
+    assert response.headers["x-request-id"] == "pytest"
+
+    # ids that could forge log lines or headers are replaced
+    response = await api_client.get(
+        "/api/user", headers={"X-Request-ID": "pytest\tinjected"}
+    )
+    assert response.headers["x-request-id"] != "pytest\tinjected"
+
+
+@pytest.mark.asyncio
+async def test_conditional(auth_client: AsyncClient, api_config: Config):
+    create = await auth_client.post("/api/repository")
+    assert create.status_code == 200, create.text
+
+    create = await auth_client.post("/api/directory", json={"path": "/cond_dir"})
+    assert create.status_code == 200, create.text
+
+    content = await auth_client.get(
+        "/api/directory/content", params={"path": "/cond_dir"}
+    )
+    assert content.status_code == 200, content.text
+    etag = content.headers["etag"]
+
+    cached = await auth_client.get(
+        "/api/directory/content",
+        params={"path": "/cond_dir"},
+        headers={"If-None-Match": f"W/{etag}"},
+    )
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    create = await auth_client.post(
+        "/api/file",
+        files={"file": ("cond.txt", BytesIO(b"conditional"))},
+        data={"path": "/cond_dir"},
+    )
+    assert create.status_code == 200, create.text
+
+    changed = await auth_client.get(
+        "/api/directory/content",
+        params={"path": "/cond_dir"},
+        headers={"If-None-Match": etag},
+    )
+    assert changed.status_code == 200, changed.text
+    assert changed.headers["etag"] != etag
+    assert changed.json()["files"][0]["path"] == "/cond_dir/cond.txt"
+
+    content = await auth_client.get("/api/repository/content")
+    assert content.status_code == 200, content.text
+    directories = {row["path"]: row for row in content.json()["directories"]}
+    assert directories["/cond_dir"]["used"] == len(b"conditional")
+
+    info = await auth_client.get("/api/file", params={"path": "/cond_dir/cond.txt"})
+    assert info.status_code == 200, info.text
+    # `updated` misses some metadata changes, only the ETag validates
+    assert "last-modified" not in info.headers
+    cached = await auth_client.get(
+        "/api/file",
+        params={"path": "/cond_dir/cond.txt"},
+        headers={"If-None-Match": info.headers["etag"]},
+    )
+    assert cached.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_compression(api_client: AsyncClient):
+    response = await api_client.get(
+        "/api/openapi.json", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert response.json()["openapi"]
+
+
+@pytest.mark.asyncio
+async def test_compression_file_response(tmp_path: Path):
+    from materia.routers import middleware
+
+    path = tmp_path.joinpath("small.json")
+    path.write_text("{}" * 1024)
+
+    async def app(scope, receive, send):
+        response = middleware.PassthroughFileResponse(
+            path, media_type="application/json"
+        )
+        await response(scope, receive, send)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=middleware.CompressionMiddleware(app)),
+        base_url="http://pytest",
+    ) as client:
+        response = await client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200, response.text
+    assert "content-encoding" not in response.headers
+    assert response.text == path.read_text()
+
+
+STARTUP = """
+import asyncio, json, sys, time
+
+start = time.perf_counter()
+import materia.models
+imported = time.perf_counter()
+eager = [name for name in ("PIL", "httpx", "bcrypt", "alembic") if name in sys.modules]
+
+from materia.app import Application
+from materia.core import Config
+
+app = Application(Config())
+app.prepare_server()
+built = time.perf_counter()
+
+from httpx import AsyncClient, ASGITransport
+
+async def request():
+    async with AsyncClient(transport=ASGITransport(app=app.backend), base_url="http://test") as client:
+        return (await client.get("/api/openapi.json")).status_code
+
+status = asyncio.run(request())
+requested = time.perf_counter()
+
+print(json.dumps({
+    "eager": eager,
+    "status": status,
+    "import": imported - start,
+    "build": built - imported,
+    "first_request": requested - built,
+}))
+"""
+
+
+def test_startup(record_property):
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP], capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+
+    startup = json.loads(result.stdout.splitlines()[-1])
+    assert startup["eager"] == []
+    assert startup["status"] == 200
+
+    for stage in ("import", "build", "first_request"):
+        record_property(f"startup_{stage}", round(startup[stage], 4))
@@ -1,4 +1,6 @@
 import pytest_asyncio
+import asyncio
+import io
 import pytest
 from pathlib import Path
 from materia.models import (
@@ -7,8 +9,10 @@ from materia.models import (
     Directory,
     RepositoryError,
     File,
+    FilePreview,
 )
-from materia.core import Config, SessionContext
+from materia.core import Config, Cron, Database, SessionContext
+from materia.core.database import migration_script
 from materia import security
 import sqlalchemy as sa
 from sqlalchemy.orm.session import make_transient
@@ -43,7 +47,7 @@ async def test_user(data, session: SessionContext, config: Config):
     await data.user.edit_password("iamnotpytest", session, config)
     assert security.validate_password("iamnotpytest", data.user.hashed_password)
 
-    await data.user.remove(session)
+    await data.user.remove(session, config)
 
 
 @pytest.mark.asyncio
@@ -281,3 +285,154 @@ async def test_file(data, tmpdir, session: SessionContext, config: Config):
         repository, Path("test1", "test_file.txt"), session, config
     )
     assert not file_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_generate_previews(
+    data, tmpdir, session: SessionContext, config: Config, cron: Cron
+):
+    from PIL import Image
+    from materia.tasks import generate_previews
+
+    config.application.working_directory = Path(tmpdir)
+
+    session.add(data.user)
+    await session.flush()
+
+    repository = await Repository(
+        user_id=data.user.id, capacity=config.repository.capacity
+    ).new(session, config)
+
+    image = io.BytesIO()
+    Image.new("RGB", (1024, 768), "white").save(image, format="PNG")
+    file = await File(
+        repository_id=repository.id, parent_id=None, name="image.png"
+    ).new(image.getvalue(), session, config)
+    # the task reads the file with its own connection
+    await session.commit()
+
+    # eagerly in a thread, the task runs its own event loop
+    result = await asyncio.to_thread(
+        generate_previews.apply, args=(file.id, file.content_hash)
+    )
+    assert sorted(result.get()) == sorted(config.preview.sizes)
+
+    for size in config.preview.sizes:
+        preview = await FilePreview.by_file(file, size, session)
+        assert preview is not None
+        with Image.open(preview.path(config)) as rendered:
+            assert max(rendered.size) == size
+
+    # previews go away with the repository
+    await repository.remove(session, config)
+    assert not FilePreview.directory(file.id, config).exists()
+
+
+@pytest.mark.asyncio
+async def test_revisions(database: Database):
+    # schema of the tests is created without migrations
+    assert await database.revisions() == set()
+
+    async with database.connection() as connection:
+        await connection.execute(
+            sa.text("create table alembic_version (version_num varchar(32))")
+        )
+        for head in migration_script().get_heads():
+            await connection.execute(
+                sa.text("insert into alembic_version values (:head)"), {"head": head}
+            )
+        await connection.commit()
+
+    assert await database.revisions() == set(migration_script().get_heads())
+    # already at head, nothing is applied over the existing schema
+    await database.run_migrations()
+
+    async with database.connection() as connection:
+        await connection.execute(sa.text("drop table alembic_version"))
+        await connection.commit()
+
+
+@pytest.mark.asyncio
+async def test_generate(data, tmpdir, session: SessionContext, config: Config):
+    from materia.app.generate import GeneratorError, TreeShape, generate_tree
+
+    config.application.working_directory = Path(tmpdir)
+
+    session.add(data.user)
+    await session.flush()
+
+    repository = await Repository(
+        user_id=data.user.id, capacity=config.repository.capacity
+    ).new(session, config)
+
+    shape = TreeShape(fan_out=3, depth=2, files=4, seed=1)
+    result = await generate_tree(repository, shape, session, config, name="tree")
+    assert result["directories"] == 3 + 9
+    assert result["files"] == (1 + 3 + 9) * 4
+
+    directory = await Directory.by_path(
+        repository, Path("tree", "dir-1", "dir-2"), session, config
+    )
+    assert directory is not None
+
+    files = (
+        await session.scalars(sa.select(File).where(File.parent_id == directory.id))
+    ).all()
+    assert sorted(file.name for file in files) == [f"file-{n}.bin" for n in range(4)]
+
+    # sparse files of the recorded sizes
+    repository_path = await repository.real_path(session, config)
+    for file in files:
+        path = repository_path.joinpath("tree", "dir-1", "dir-2", file.name)
+        assert path.stat().st_size == file.size
+
+    with pytest.raises(GeneratorError):
+        await generate_tree(repository, shape, session, config, name="tree")
+
+    shape = TreeShape(fan_out=1, depth=1, files=3, collisions=1, seed=1)
+    await generate_tree(
+        repository, shape, session, config, name="collisions", metadata_only=True
+    )
+    directory = await Directory.by_path(
+        repository, Path("collisions", "dir-0"), session, config
+    )
+    files = (
+        await session.scalars(sa.select(File).where(File.parent_id == directory.id))
+    ).all()
+    assert sorted(file.name for file in files) == [
+        "file-0.1.bin",
+        "file-0.2.bin",
+        "file-0.bin",
+    ]
+
+    # files of the top directory only
+    shape = TreeShape(depth=0, files=2, seed=1)
+    result = await generate_tree(repository, shape, session, config, name="flat")
+    directory = await Directory.by_path(repository, Path("flat"), session, config)
+    files = (
+        await session.scalars(sa.select(File).where(File.parent_id == directory.id))
+    ).all()
+    assert len(files) == result["files"] == 2
+
+    shape = TreeShape(
+        depth=0,
+        files=1,
+        file_size=repository.capacity + 1,
+        size_distribution="fixed",
+        seed=1,
+    )
+    with pytest.raises(GeneratorError):
+        await generate_tree(
+            repository, shape, session, config, name="large", metadata_only=True
+        )
+
+    await generate_tree(
+        repository,
+        shape,
+        session,
+        config,
+        name="large",
+        metadata_only=True,
+        grow_capacity=True,
+    )
+    assert repository.capacity > shape.file_size